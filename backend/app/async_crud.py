@@ -0,0 +1,70 @@
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from . import models, schemas
+from .crud import (
+    prediction_count_query,
+    prediction_stats_query,
+    predictions_query,
+    recent_analyses_query,
+    report_export_query,
+    user_by_email_query,
+)
+from .portfolio import portfolio_stats
+from typing import List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the hot-path functions in crud.py; queries are shared with it
+
+# User operations
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    return (await db.scalars(user_by_email_query(email))).first()
+
+# Prediction operations
+async def create_prediction(db: AsyncSession, prediction_data: schemas.PredictionCreate, user_id: Optional[int]):
+    logger.info(f"Creating prediction for user {user_id}")
+    db_prediction = models.Prediction(
+        **prediction_data.dict(),
+        user_id=user_id,
+        timestamp=datetime.utcnow()
+    )
+    db.add(db_prediction)
+    try:
+        # The id comes back from the INSERT; sessions don't expire on commit so no refresh is needed
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to create prediction: {str(e)}")
+        raise
+    portfolio_stats.record(
+        db_prediction.credit_score, db_prediction.risk_level, db_prediction.decision, user_id
+    )
+    logger.info(f"Prediction created successfully: {db_prediction.id}")
+    return db_prediction
+
+async def get_predictions(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    order_by: str = "timestamp",
+    order_direction: str = "desc",
+    after: Optional[str] = None
+) -> List[models.Prediction]:
+    query = predictions_query(user_id, skip, limit, order_by, order_direction, after)
+    return (await db.scalars(query)).all()
+
+async def get_recent_analyses(db: AsyncSession, user_id: Optional[int], limit: int = 5) -> List[models.Prediction]:
+    return (await db.scalars(recent_analyses_query(user_id, limit))).all()
+
+async def get_report_export_page(db: AsyncSession, user_id: Optional[int], **filters) -> List[models.Prediction]:
+    return (await db.scalars(report_export_query(user_id, **filters))).all()
+
+async def get_user_prediction_count(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    return await db.scalar(prediction_count_query(user_id))
+
+async def get_prediction_stats(db: AsyncSession, since: Optional[datetime] = None) -> dict:
+    row = (await db.execute(prediction_stats_query(since))).one()
+    return {key: int(value) for key, value in row._mapping.items()}
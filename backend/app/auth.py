@@ -1,9 +1,13 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import logging
+from .executors import BoundedExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,9 +19,26 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 PASSWORD_RESET_TOKEN_EXPIRE_HOURS = 1
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; pinning min and max rounds makes needs_update flag hashes of any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt is deliberately slow CPU work; keep it in its own small pool so login bursts
+# cannot starve the event loop or the inference workers
+password_executor = BoundedExecutor(
+    "password",
+    max_workers=int(os.getenv("PASSWORD_WORKERS", "2")),
+    max_queue=int(os.getenv("PASSWORD_QUEUE_DEPTH", "32")),
+    retry_after=int(os.getenv("EXECUTOR_RETRY_AFTER", "1"))
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hashed version"""
@@ -27,6 +48,18 @@ def get_password_hash(password: str) -> str:
     """Generate a hashed version of the password"""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verify a password; also return a new hash if the stored one uses an outdated cost"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash, run in the password worker pool"""
+    return await password_executor.run(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    """verify_and_update_password, run in the password worker pool"""
+    return await password_executor.run(verify_and_update_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """
     Creates a JWT access token with expiration time
@@ -50,14 +83,13 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def verify_token(token: str, is_refresh: bool = False):
+def decode_token(token: str, is_refresh: bool = False) -> Optional[dict]:
     """
-    Verifies a JWT token and returns the email if valid
+    Verifies a JWT token and returns its payload if it is valid and of the expected type
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+        if payload.get("sub") is None:
             return None
             
         # Check token type
@@ -67,10 +99,75 @@ async def verify_token(token: str, is_refresh: bool = False):
         elif not is_refresh and token_type != "access":
             return None
             
-        return email
+        return payload
     except JWTError:
         return None
 
+async def verify_token(token: str, is_refresh: bool = False):
+    """
+    Verifies a JWT token and returns the email if valid
+    """
+    payload = decode_token(token, is_refresh=is_refresh)
+    return payload["sub"] if payload else None
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified access tokens to the user they resolve to.
+    Entries expire at the token's own ``exp`` and can be dropped per user.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, user_id, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: Any, user_id: int, expires_at: float):
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (user, user_id, expires_at)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Forget every cached token of a user, e.g. after the user was updated"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def _remove(self, token: str):
+        _, user_id, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
 def create_password_reset_token(email: str) -> str:
     """
     Creates a password reset token that expires in 1 hour
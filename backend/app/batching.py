@@ -0,0 +1,131 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .executors import BoundedExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_DELAY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100]
+
+
+class Histogram:
+    """Fixed-bucket histogram with count and sum, cheap enough for the request path"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{b}" for b in self.buckets] + ["inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row scoring calls into one vectorized model call.
+
+    Callers ``submit`` an encoded feature vector and await their own row's
+    probability. Rows are collected until ``max_batch_size`` is reached or
+    ``window_ms`` has passed since the first one arrived, then scored together
+    in the inference executor. Rows submitted with different ``score_many``
+    functions (e.g. across a model swap) are scored in separate calls.
+    """
+
+    def __init__(
+        self,
+        score_many: Callable[[np.ndarray], np.ndarray],
+        executor: BoundedExecutor,
+        window_ms: float,
+        max_batch_size: int
+    ):
+        self.score_many = score_many
+        self.executor = executor
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delays = Histogram(QUEUE_DELAY_BUCKETS_MS)
+
+    async def submit(self, vector: np.ndarray, score_many: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> float:
+        """Queue one feature vector and wait for its probability of default"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((vector, future, time.perf_counter(), score_many or self.score_many))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        dispatched_at = time.perf_counter()
+        for _, _, submitted_at, _ in batch:
+            self.queue_delays.observe((dispatched_at - submitted_at) * 1000)
+
+        groups = {}
+        for row in batch:
+            groups.setdefault(row[3], []).append(row)
+        for score_many, group in groups.items():
+            await self._run_group(score_many, group)
+
+    async def _run_group(self, score_many, batch):
+        self.batch_sizes.observe(len(batch))
+        try:
+            probabilities = await self.executor.run(
+                score_many, np.vstack([vector for vector, _, _, _ in batch])
+            )
+        except Exception as e:
+            logger.error(f"Micro-batch of {len(batch)} rows failed: {str(e)}")
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _, _), probability in zip(batch, probabilities):
+            # Callers that disconnected have cancelled their future
+            if not future.done():
+                future.set_result(probability)
+
+    def stats(self) -> dict:
+        """Batch-size distribution and queueing delay since startup"""
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "pending": len(self._pending),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_delay_ms": self.queue_delays.snapshot()
+        }
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+import os
+from itertools import product
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "32"))
+WS_MAX_CONSECUTIVE_DROPS = int(os.getenv("WS_MAX_CONSECUTIVE_DROPS", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+BROADCAST_INBOX_SIZE = int(os.getenv("BROADCAST_INBOX_SIZE", "10000"))
+
+# Wildcard slot in the subscription index
+ANY = "*"
+
+
+class Topic(NamedTuple):
+    """Routing key of an event: the owning user (None for anonymous) and its labels"""
+    owner: Optional[int]
+    risk_level: str
+    decision: str
+
+
+def _normalize(values: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    if not values:
+        return None
+    return frozenset(v.strip().lower() for v in values if v and v.strip()) or None
+
+
+class Subscription:
+    """
+    Which events a client receives: those owned by one of ``owners`` and,
+    when given, only with a matching risk level and decision.
+    """
+
+    def __init__(
+        self,
+        owners: Iterable[Optional[int]],
+        risk_levels: Optional[Iterable[str]] = None,
+        decisions: Optional[Iterable[str]] = None
+    ):
+        self.owners = frozenset(owners)
+        self.risk_levels = _normalize(risk_levels)
+        self.decisions = _normalize(decisions)
+
+    def keys(self) -> Iterable[Tuple]:
+        """Index keys this subscription is stored under; an event matches at most one"""
+        return product(
+            self.owners,
+            self.risk_levels or (ANY,),
+            self.decisions or (ANY,)
+        )
+
+    def describe(self) -> dict:
+        return {
+            "owners": sorted(self.owners, key=lambda owner: (owner is not None, owner or 0)),
+            "risk_level": sorted(self.risk_levels) if self.risk_levels else None,
+            "decision": sorted(self.decisions) if self.decisions else None
+        }
+
+
+class ClientConnection:
+    """One WebSocket plus its bounded outbound queue and sender task"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, user_id: Optional[int] = None):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.subscription: Optional[Subscription] = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.consecutive_drops = 0
+        self.closed = False
+
+    def offer(self, text: str) -> bool:
+        """
+        Queue a message without waiting. When the queue is full the oldest
+        pending message is discarded so a slow client always converges on the
+        newest state; returns False when something was dropped.
+        """
+        try:
+            self.queue.put_nowait(text)
+            self.consecutive_drops = 0
+            return True
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(text)
+            self.consecutive_drops += 1
+            return False
+
+
+class BroadcastHub:
+    """
+    Fans messages out to WebSocket clients without blocking the publisher.
+
+    ``publish`` hands the event to a pub/sub backend (see ``pubsub``), which
+    calls ``deliver`` on the hub of every worker; in-process that is a direct
+    call. ``deliver`` only appends to an inbox. A dispatcher task serializes
+    each message once and offers the text to the bounded queue of every
+    client whose subscription matches the event's topic; a per-client sender
+    task drains that queue. Clients that keep overflowing their queue or
+    stall on a send are disconnected.
+
+    Subscriptions are indexed by (owner, risk level, decision) with wildcard
+    slots, so routing an event costs four dict lookups plus one queue offer
+    per matching client, independent of how many clients are connected.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WS_QUEUE_SIZE,
+        max_consecutive_drops: int = WS_MAX_CONSECUTIVE_DROPS,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        inbox_size: int = BROADCAST_INBOX_SIZE
+    ):
+        self.queue_size = queue_size
+        self.max_consecutive_drops = max_consecutive_drops
+        self.send_timeout = send_timeout
+        self.clients: Set[ClientConnection] = set()
+        self._index: Dict[Tuple, Set[ClientConnection]] = {}
+        self._inbox: Optional[asyncio.Queue] = None
+        self._inbox_size = inbox_size
+        self._dispatcher: Optional[asyncio.Task] = None
+        # Disconnects scheduled from _fan_out; held here so they are not garbage-collected before running
+        self._tasks: Set[asyncio.Task] = set()
+        self.backend = None
+        self.messages_published = 0
+        self.messages_delivered = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.inbox_dropped = 0
+        self.clients_dropped = 0
+
+    # Lifecycle
+    async def start(self, backend=None):
+        if self._dispatcher is None:
+            self._inbox = asyncio.Queue(maxsize=self._inbox_size)
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        if backend is not None:
+            self.backend = backend
+            await self.backend.start(self.deliver)
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.stop()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for client in list(self.clients):
+            await self.disconnect(client)
+
+    # Connections
+    async def connect(
+        self,
+        websocket: WebSocket,
+        subscription: Subscription,
+        user_id: Optional[int] = None
+    ) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(websocket, self.queue_size, user_id=user_id)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self.clients.add(client)
+        self.subscribe(client, subscription)
+        return client
+
+    def subscribe(self, client: ClientConnection, subscription: Subscription):
+        """Replace a client's subscription and re-index it"""
+        self._unindex(client)
+        client.subscription = subscription
+        for key in subscription.keys():
+            self._index.setdefault(key, set()).add(client)
+
+    def _unindex(self, client: ClientConnection):
+        if client.subscription is None:
+            return
+        for key in client.subscription.keys():
+            subscribers = self._index.get(key)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._index[key]
+        client.subscription = None
+
+    async def disconnect(self, client: ClientConnection, close: bool = False):
+        if client.closed:
+            return
+        client.closed = True
+        self.clients.discard(client)
+        self._unindex(client)
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        if close:
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
+
+    def send(self, client: ClientConnection, message: dict):
+        """Queue a message for one client, e.g. a pong"""
+        client.offer(json.dumps(message))
+
+    # Publishing
+    def publish(self, message: dict, topic: Optional[Topic] = None):
+        """
+        Send a message to subscribers on every worker; never waits on any
+        client. Without a topic the message goes to every connected client.
+        """
+        self.messages_published += 1
+        if self.backend is None:
+            self.deliver(message, topic)
+        else:
+            self.backend.publish(message, topic)
+
+    def deliver(self, message: dict, topic: Optional[Topic] = None):
+        """Queue a message for this worker's clients; called by the pub/sub backend"""
+        if self._inbox is None:
+            logger.warning("Broadcast hub not started, dropping message")
+            self.inbox_dropped += 1
+            return
+        try:
+            self._inbox.put_nowait((message, topic))
+            self.messages_delivered += 1
+        except asyncio.QueueFull:
+            self.inbox_dropped += 1
+            logger.warning("Broadcast inbox full, dropping message")
+
+    async def _dispatch_loop(self):
+        while True:
+            message, topic = await self._inbox.get()
+            try:
+                self._fan_out(message, topic)
+            except Exception as e:
+                logger.error(f"Broadcast dispatch failed: {str(e)}")
+
+    def _matching(self, topic: Topic) -> Set[ClientConnection]:
+        risk_level = topic.risk_level.lower()
+        decision = topic.decision.lower()
+        matches = set()
+        for key in (
+            (topic.owner, risk_level, decision),
+            (topic.owner, risk_level, ANY),
+            (topic.owner, ANY, decision),
+            (topic.owner, ANY, ANY),
+        ):
+            subscribers = self._index.get(key)
+            if subscribers:
+                matches.update(subscribers)
+        return matches
+
+    def _fan_out(self, message: dict, topic: Optional[Topic] = None):
+        recipients = self.clients if topic is None else self._matching(topic)
+        if not recipients:
+            return
+        # Serialize once, then enqueue the same text for every recipient
+        text = json.dumps(message)
+        for client in list(recipients):
+            if not client.offer(text):
+                self.messages_dropped += 1
+                # Exactly at the limit, so a client is only scheduled for disconnect once
+                if client.consecutive_drops == self.max_consecutive_drops:
+                    logger.warning("Dropping WebSocket client that cannot keep up")
+                    self.clients_dropped += 1
+                    task = asyncio.create_task(self.disconnect(client, close=True))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+    async def _send_loop(self, client: ClientConnection):
+        try:
+            while True:
+                text = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(text), timeout=self.send_timeout)
+                self.messages_sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket send failed, disconnecting client: {str(e)}")
+            await self.disconnect(client, close=True)
+
+    def stats(self) -> dict:
+        depths = [client.queue.qsize() for client in self.clients]
+        return {
+            "connections": len(self.clients),
+            "subscription_keys": len(self._index),
+            "inbox_depth": self._inbox.qsize() if self._inbox is not None else 0,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "messages_published": self.messages_published,
+            "messages_delivered": self.messages_delivered,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "inbox_dropped": self.inbox_dropped,
+            "clients_dropped": self.clients_dropped,
+            "pubsub": self.backend.stats() if self.backend is not None else None
+        }
+
+
+hub = BroadcastHub()
@@ -1,19 +1,22 @@
+import base64
+import json
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from passlib.context import CryptContext
+from sqlalchemy import case, desc, func, insert, select, tuple_
 from datetime import datetime
-from . import models, schemas
+from . import auth, models, schemas
+from .portfolio import portfolio_stats
 from typing import List, Optional
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # User CRUD operations
+def user_by_email_query(email: str):
+    return select(models.User).where(models.User.email == email).limit(1)
+
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.email == email).first()
+    return db.scalars(user_by_email_query(email)).first()
 
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -21,8 +24,9 @@ def get_user(db: Session, user_id: int) -> Optional[models.User]:
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
     return db.query(models.User).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = auth.get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -42,19 +46,18 @@ def update_user(
     if db_user:
         update_data = user_update.dict(exclude_unset=True)
         if "password" in update_data:
-            hashed_password = pwd_context.hash(update_data["password"])
+            hashed_password = auth.get_password_hash(update_data["password"])
             db_user.hashed_password = hashed_password
         db.commit()
         db.refresh(db_user)
+        auth.token_cache.invalidate_user(user_id)
     return db_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
-    if not user:
-        return False
-    if not pwd_context.verify(password, user.hashed_password):
-        return False
-    return user
+def set_password_hash(db: Session, db_user: models.User, hashed_password: str) -> models.User:
+    db_user.hashed_password = hashed_password
+    db.commit()
+    db.refresh(db_user)
+    return db_user
 
 # Prediction CRUD operations
 def create_prediction(db: Session, prediction_data: schemas.PredictionCreate, user_id: int):
@@ -68,6 +71,9 @@ def create_prediction(db: Session, prediction_data: schemas.PredictionCreate, us
     try:
         db.commit()
         db.refresh(db_prediction)
+        portfolio_stats.record(
+            db_prediction.credit_score, db_prediction.risk_level, db_prediction.decision, user_id
+        )
         logger.info(f"Prediction created successfully: {db_prediction.id}")
         return db_prediction
     except Exception as e:
@@ -75,33 +81,137 @@ def create_prediction(db: Session, prediction_data: schemas.PredictionCreate, us
         logger.error(f"Failed to create prediction: {str(e)}")
         raise
 
+def prediction_rows(predictions: List[schemas.PredictionCreate], user_id: Optional[int]) -> List[dict]:
+    timestamp = datetime.utcnow()
+    return [
+        {**prediction.dict(), "user_id": user_id, "timestamp": timestamp}
+        for prediction in predictions
+    ]
+
+def bulk_insert_statement():
+    """Multi-row INSERT ... RETURNING id, with ids in parameter order"""
+    return insert(models.Prediction).returning(models.Prediction.id, sort_by_parameter_order=True)
+
+def create_predictions_bulk(
+    db: Session,
+    predictions: List[schemas.PredictionCreate],
+    user_id: Optional[int]
+) -> List[int]:
+    """Insert many predictions in one multi-row statement and return their ids in input order"""
+    logger.info(f"Creating {len(predictions)} predictions for user {user_id}")
+    try:
+        prediction_ids = db.scalars(bulk_insert_statement(), prediction_rows(predictions, user_id)).all()
+        db.commit()
+        for prediction in predictions:
+            portfolio_stats.record(
+                prediction.credit_score, prediction.risk_level, prediction.decision, user_id
+            )
+        logger.info(f"Created {len(prediction_ids)} predictions")
+        return list(prediction_ids)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to create predictions: {str(e)}")
+        raise
+
 def get_prediction(db: Session, prediction_id: int) -> Optional[models.Prediction]:
     return db.query(models.Prediction).filter(models.Prediction.id == prediction_id).first()
 
-def get_predictions(
-    db: Session, 
-    user_id: int, 
+def encode_cursor(prediction: models.Prediction) -> str:
+    """Opaque keyset cursor pointing just past the given prediction"""
+    raw = json.dumps([prediction.timestamp.isoformat(), prediction.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        timestamp, prediction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(prediction_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def predictions_query(
+    user_id: Optional[int], 
     skip: int = 0, 
     limit: int = 100,
     order_by: str = "timestamp",
-    order_direction: str = "desc"
-) -> List[models.Prediction]:
-    query = db.query(models.Prediction).filter(models.Prediction.user_id == user_id)
+    order_direction: str = "desc",
+    after: Optional[str] = None
+):
+    query = select(models.Prediction).where(models.Prediction.user_id == user_id)
+    
+    # Keyset pagination walks ix_predictions_user_id_timestamp, so deep pages cost the same as the first
+    if after is not None:
+        if skip:
+            raise ValueError("skip cannot be combined with a cursor")
+        timestamp, prediction_id = decode_cursor(after)
+        query = query.where(
+            tuple_(models.Prediction.timestamp, models.Prediction.id) < tuple_(timestamp, prediction_id)
+        )
+        return query.order_by(desc(models.Prediction.timestamp), desc(models.Prediction.id)).limit(limit)
     
     # Apply ordering
     order_column = getattr(models.Prediction, order_by, models.Prediction.timestamp)
     if order_direction.lower() == "desc":
-        query = query.order_by(desc(order_column))
+        query = query.order_by(desc(order_column), desc(models.Prediction.id))
     else:
-        query = query.order_by(order_column)
+        query = query.order_by(order_column, models.Prediction.id)
     
-    return query.offset(skip).limit(limit).all()
+    return query.offset(skip).limit(limit)
 
-def get_user_prediction_count(db: Session, user_id: Optional[int] = None):
+def get_predictions(
+    db: Session, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100,
+    order_by: str = "timestamp",
+    order_direction: str = "desc",
+    after: Optional[str] = None
+) -> List[models.Prediction]:
+    query = predictions_query(user_id, skip, limit, order_by, order_direction, after)
+    return db.scalars(query).all()
+
+def prediction_count_query(user_id: Optional[int] = None):
+    query = select(func.count(models.Prediction.id))
     if user_id is not None:
-        return db.query(models.Prediction).filter(models.Prediction.user_id == user_id).count()
-    else:
-        return db.query(models.Prediction).count()
+        query = query.where(models.Prediction.user_id == user_id)
+    return query
+
+def get_user_prediction_count(db: Session, user_id: Optional[int] = None):
+    return db.scalar(prediction_count_query(user_id))
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def prediction_stats_query(since: Optional[datetime] = None, by_user: bool = False):
+    """Aggregate over predictions: totals, risk, score bucket and decision counts, optionally per user"""
+    risk_level = func.lower(models.Prediction.risk_level)
+    decision = func.lower(models.Prediction.decision)
+    score = models.Prediction.credit_score
+    
+    query = select(
+        func.count(models.Prediction.id).label("total"),
+        func.coalesce(func.sum(score), 0).label("score_sum"),
+        _count_where(risk_level.in_(["high", "very high"])).label("high_risk"),
+        _count_where(risk_level == "medium").label("medium_risk"),
+        _count_where(score.between(300, 579)).label("score_high_risk"),
+        _count_where(score.between(580, 667)).label("score_medium_risk"),
+        _count_where(score.between(668, 850)).label("score_low_risk"),
+        _count_where(decision == "approved").label("approved"),
+        _count_where(decision == "approved with conditions").label("approved_with_conditions"),
+        _count_where(decision == "declined").label("declined"),
+    )
+    if since is not None:
+        query = query.where(models.Prediction.timestamp >= since)
+    if by_user:
+        query = query.add_columns(models.Prediction.user_id).group_by(models.Prediction.user_id)
+    return query
+
+def get_prediction_stats(db: Session, since: Optional[datetime] = None) -> dict:
+    row = db.execute(prediction_stats_query(since)).one()
+    return {key: int(value) for key, value in row._mapping.items()}
+
+def get_prediction_stats_by_user(db: Session) -> List[dict]:
+    return [dict(row._mapping) for row in db.execute(prediction_stats_query(by_user=True))]
 
 def delete_prediction(db: Session, prediction_id: int, user_id: int) -> bool:
     db_prediction = db.query(models.Prediction).filter(
@@ -109,29 +219,62 @@ def delete_prediction(db: Session, prediction_id: int, user_id: int) -> bool:
         models.Prediction.user_id == user_id
     ).first()
     if db_prediction:
+        removed = (db_prediction.credit_score, db_prediction.risk_level, db_prediction.decision)
         db.delete(db_prediction)
         db.commit()
+        portfolio_stats.remove(*removed, user_id)
         return True
     return False
 
+def recent_analyses_query(user_id: Optional[int], limit: int = 5):
+    return (
+        select(models.Prediction)
+        .where(models.Prediction.user_id == user_id)
+        .order_by(models.Prediction.timestamp.desc(), models.Prediction.id.desc())
+        .limit(limit)
+    )
+
+def report_export_query(
+    user_id: Optional[int],
+    prediction_ids: Optional[List[int]] = None,
+    risk_level: Optional[str] = None,
+    decision: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[tuple] = None,
+    limit: int = 500
+):
+    """One keyset page of predictions to export, newest first; ``after`` is the last (timestamp, id) seen"""
+    query = select(models.Prediction).where(models.Prediction.user_id == user_id)
+    if prediction_ids:
+        query = query.where(models.Prediction.id.in_(prediction_ids))
+    if risk_level:
+        query = query.where(func.lower(models.Prediction.risk_level) == risk_level.lower())
+    if decision:
+        query = query.where(func.lower(models.Prediction.decision) == decision.lower())
+    if since is not None:
+        query = query.where(models.Prediction.timestamp >= since)
+    if until is not None:
+        query = query.where(models.Prediction.timestamp < until)
+    if after is not None:
+        query = query.where(
+            tuple_(models.Prediction.timestamp, models.Prediction.id) < tuple_(*after)
+        )
+    return query.order_by(desc(models.Prediction.timestamp), desc(models.Prediction.id)).limit(limit)
+
 def get_recent_analyses(
     db: Session, 
     user_id: int, 
     limit: int = 5
 ) -> List[models.Prediction]:
-    return (
-        db.query(models.Prediction)
-        .filter(models.Prediction.user_id == user_id)
-        .order_by(models.Prediction.timestamp.desc())
-        .limit(limit)
-        .all()
-    )
+    return db.scalars(recent_analyses_query(user_id, limit)).all()
     
 def create_test_predictions(db: Session, user_id: int, count: int = 10):
     import random
     from datetime import datetime, timedelta
     
     risk_levels = ["very low", "low", "medium", "high", "very high"]
+    created = []
     decisions = ["approved", "approved with conditions", "declined"]
     
     for i in range(count):
@@ -153,5 +296,8 @@ def create_test_predictions(db: Session, user_id: int, count: int = 10):
             timestamp=datetime.now() - timedelta(days=random.randint(0, 30))
         )
         db.add(db_prediction)
+        created.append((score, risk, decision))
     
-    db.commit()
\ No newline at end of file
+    db.commit()
+    for score, risk, decision in created:
+        portfolio_stats.record(score, risk, decision, user_id)
\ No newline at end of file
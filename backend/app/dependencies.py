@@ -0,0 +1,70 @@
+import logging
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import async_crud, auth, schemas
+from .database import get_async_db
+from .metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def credentials_exception(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def bearer_token(request: Request) -> Optional[str]:
+    """Token from the Authorization header, with or without the Bearer prefix"""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return None
+    return auth_header.split(" ")[1] if " " in auth_header else auth_header
+
+async def resolve_user(token: str, db: AsyncSession) -> Optional[schemas.User]:
+    """
+    Resolve an access token to its user. A cached token costs no signature
+    check and no DB query; a miss verifies the JWT and looks the user up once.
+    """
+    user = auth.token_cache.get(token)
+    if user is not None:
+        return user
+    
+    payload = auth.decode_token(token)
+    if payload is None:
+        return None
+    db_user = await async_crud.get_user_by_email(db, email=payload["sub"])
+    if db_user is None:
+        return None
+    
+    user = schemas.User.model_validate(db_user)
+    auth.token_cache.put(token, user, user.id, float(payload["exp"]))
+    return user
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> schemas.User:
+    """Dependency for endpoints that require an authenticated user"""
+    token = bearer_token(request)
+    if not token:
+        raise credentials_exception("Authorization header missing")
+    with metrics.timed("auth"):
+        user = await resolve_user(token, db)
+    if user is None:
+        raise credentials_exception()
+    return user
+
+async def get_optional_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> Optional[schemas.User]:
+    """Dependency for endpoints that also serve anonymous callers"""
+    token = bearer_token(request)
+    if not token:
+        return None
+    try:
+        with metrics.timed("auth"):
+            user = await resolve_user(token, db)
+    except Exception as e:
+        logger.warning(f"Token verification failed: {str(e)}")
+        return None
+    if user is None:
+        logger.warning("Token verification failed: invalid token or unknown user")
+    return user
@@ -0,0 +1,89 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a bounded executor has no free worker or queue slot"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Executor '{name}' is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a hard cap on running plus queued work.
+
+    ``run`` hands blocking work to the pool from async code. When all workers
+    are busy and ``max_queue`` tasks are already waiting, it raises
+    ``ExecutorSaturated`` right away instead of letting the backlog grow.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the pool and await its result"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            logger.warning(f"Executor '{self.name}' saturated, rejecting work")
+            raise ExecutorSaturated(self.name, self.retry_after)
+
+        with self._lock:
+            self._in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self._executor, self._release_after, functools.partial(fn, *args, **kwargs)
+            )
+        except RuntimeError:
+            # Pool already shut down; the task never ran, so free its slot here
+            self._release(completed=False)
+            raise
+        return await future
+
+    def _release_after(self, task):
+        # The slot is held until the work itself finishes, even if the caller was cancelled
+        try:
+            return task()
+        finally:
+            self._release(completed=True)
+
+    def _release(self, completed: bool):
+        with self._lock:
+            self._in_flight -= 1
+            if completed:
+                self._completed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """Current load and lifetime counters"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self.max_workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,379 @@
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = ['yes', 'true', '1']
+
+# has_guarantee class labels as the encoder was fitted on them, indexed by the flag
+FLAG_LABELS = ('False_', 'True_')
+
+# Class label used for unseen categories; empty means the first class of each encoder
+UNSEEN_CATEGORY_FALLBACK = os.getenv("UNSEEN_CATEGORY_FALLBACK", "")
+
+
+class CategoryEncoder:
+    """
+    Precomputed string-to-code lookup tables for every categorical column.
+
+    Built once at model load from the fitted ``LabelEncoder`` objects, so
+    encoding is a dict lookup instead of a scan over ``classes_`` plus a
+    ``transform`` call. Unseen values map to an explicit per-column fallback
+    code and are counted per column.
+    """
+
+    def __init__(
+        self,
+        label_encoders: dict,
+        cat_cols: Iterable[str],
+        fallback: Optional[str] = None,
+        fallback_codes: Optional[Dict[str, int]] = None
+    ):
+        # Accepts fitted LabelEncoders or their classes_ arrays (as stored in a model artifact)
+        self.tables: Dict[str, Dict[str, int]] = {}
+        self.fallback_codes: Dict[str, int] = {}
+        for col in cat_cols:
+            classes = getattr(label_encoders[col], "classes_", label_encoders[col])
+            table = {str(c): i for i, c in enumerate(classes)}
+            self.tables[col] = table
+            if fallback_codes and col in fallback_codes:
+                self.fallback_codes[col] = int(fallback_codes[col])
+            else:
+                # Default matches the historical behaviour of using classes_[0]
+                self.fallback_codes[col] = table.get(fallback, 0) if fallback else 0
+
+        self.unseen_counts: Dict[str, int] = {col: 0 for col in self.tables}
+        self._lock = threading.Lock()
+
+    def encode(self, col: str, value) -> int:
+        """Encode a single raw value of a categorical column"""
+        str_value = "missing" if value is None or pd.isna(value) else str(value)
+        code = self.tables[col].get(str_value)
+        if code is None:
+            logger.warning(f"Unseen category '{str_value}' in column '{col}', using fallback category")
+            self._record_unseen(col, 1)
+            return self.fallback_codes[col]
+        return code
+
+    def encode_many(self, col: str, values) -> np.ndarray:
+        """Encode a whole column of raw values in one vectorized pass"""
+        series = pd.Series(values)
+        series = series.astype(str).where(series.notna(), "missing")
+        codes = series.map(self.tables[col])
+
+        unseen = codes.isna()
+        if unseen.any():
+            n_unseen = int(unseen.sum())
+            logger.warning(f"{n_unseen} unseen categories in column '{col}', using fallback category")
+            self._record_unseen(col, n_unseen)
+            codes = codes.fillna(self.fallback_codes[col])
+
+        return codes.to_numpy(dtype=np.int64)
+
+    def _record_unseen(self, col: str, count: int):
+        with self._lock:
+            self.unseen_counts[col] += count
+
+    def stats(self) -> dict:
+        """Unseen-category hits per column since startup"""
+        with self._lock:
+            return dict(self.unseen_counts)
+
+
+def _unwrap(transformer):
+    """Return the single step of a one-step Pipeline, or the transformer itself"""
+    steps = getattr(transformer, "steps", None)
+    if steps is not None and len(steps) == 1:
+        return steps[0][1]
+    return transformer
+
+
+class CompiledScorer:
+    """
+    Pandas-free scoring path compiled once from the loaded model artifacts.
+
+    Applications are turned straight into a float64 feature vector laid out in
+    the same column order as ``preprocess_input`` builds, then fed through the
+    fitted preprocessing and estimator without creating a DataFrame.
+
+    Three modes exist, picked at build time by checking them against the
+    reference pandas path on probe rows and keeping the first whose
+    probabilities are bit-identical:
+
+    - ``linear``: design matrix plus ``X @ coef_.T + intercept_`` and ``expit``
+    - ``estimator``: design matrix handed to the final estimator's ``predict_proba``
+    - ``frame``: one-row DataFrame handed to the full model (always identical)
+    """
+
+    def __init__(
+        self,
+        model_data: dict,
+        feature_mapping: Dict[str, str],
+        encoder: Optional[CategoryEncoder] = None
+    ):
+        self.model = model_data['model']
+        self.label_encoders = model_data['label_encoders']
+        self._init_layout(
+            feature_mapping,
+            model_data['num_cols'],
+            model_data['cat_cols'],
+            encoder or CategoryEncoder(self.label_encoders, model_data['cat_cols'])
+        )
+
+        self.mode = "frame"
+        try:
+            self._compile_design()
+        except Exception as e:
+            logger.warning(f"Model structure not compilable, using frame scoring: {str(e)}")
+            return
+        self.mode = self._select_mode()
+        logger.info(f"Compiled scorer ready ({self.mode} mode, {self.n_features} features)")
+
+    @classmethod
+    def from_arrays(
+        cls,
+        feature_mapping: Dict[str, str],
+        num_cols: List[str],
+        cat_cols: List[str],
+        encoder: CategoryEncoder,
+        blocks: list,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        sparse: bool = False
+    ) -> "CompiledScorer":
+        """
+        Linear-mode scorer rebuilt from exported design blocks and coefficients,
+        without the fitted sklearn objects (see ``model_artifact``)
+        """
+        self = cls.__new__(cls)
+        self.model = None
+        self.label_encoders = None
+        self._init_layout(feature_mapping, num_cols, cat_cols, encoder)
+        self._blocks = blocks
+        self._n_design = len(coef)
+        self._sparse = sparse
+        self._estimator = None
+        self._coef_t = np.asarray(coef).reshape(-1, 1)
+        self._intercept = np.asarray(intercept)
+        self.mode = "linear"
+        return self
+
+    def _init_layout(
+        self,
+        feature_mapping: Dict[str, str],
+        num_cols: Iterable[str],
+        cat_cols: Iterable[str],
+        encoder: CategoryEncoder
+    ):
+        self.num_cols = list(num_cols)
+        self.cat_cols = list(cat_cols)
+        self.encoder = encoder
+
+        # Feature layout, identical to the columns produced by preprocess_input
+        self.feature_names: List[str] = [
+            model_feature for model_feature in feature_mapping.values()
+            if model_feature in self.num_cols or model_feature in self.cat_cols
+        ]
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        self.n_features = len(self.feature_names)
+
+        # Per-field conversion plan: (form field, slot, kind, categorical column)
+        self._plan = []
+        for form_field, model_feature in feature_mapping.items():
+            if model_feature not in self.feature_index:
+                continue
+            slot = self.feature_index[model_feature]
+            if model_feature in self.num_cols:
+                self._plan.append((form_field, slot, "num", None))
+            else:
+                kind = "flag" if model_feature == 'has_guarantee' else "cat"
+                self._plan.append((form_field, slot, kind, model_feature))
+
+    # Vectorization
+    def vectorize(self, data: dict) -> np.ndarray:
+        """Convert one form payload to an encoded feature vector"""
+        vector = np.empty(self.n_features, dtype=np.float64)
+        self._fill(vector, data)
+        return vector
+
+    def vectorize_many(self, records: List[dict]) -> np.ndarray:
+        """Convert many form payloads to an encoded feature matrix"""
+        matrix = np.empty((len(records), self.n_features), dtype=np.float64)
+        for row, data in zip(matrix, records):
+            self._fill(row, data)
+        return matrix
+
+    def _fill(self, out: np.ndarray, data: dict):
+        encode = self.encoder.encode
+        for form_field, slot, kind, col in self._plan:
+            value = data[form_field]
+            if kind == "num":
+                out[slot] = float(value)
+                continue
+            if kind == "flag":
+                value = FLAG_LABELS[str(value).lower() in TRUE_VALUES]
+            out[slot] = encode(col, value)
+
+    def feature_dict(self, vector: np.ndarray) -> dict:
+        """Feature name to value mapping, as consumed by get_key_factors"""
+        return dict(zip(self.feature_names, vector.tolist()))
+
+    # Scoring
+    def predict_proba(self, vectors: np.ndarray) -> np.ndarray:
+        """Probability of default for each row of an encoded feature matrix"""
+        vectors = np.atleast_2d(vectors)
+        if self.mode == "linear":
+            design = self._design(vectors)
+            scores = design @ self._coef_t + self._intercept
+            return expit(scores.reshape(-1))
+        if self.mode == "estimator":
+            return self._estimator.predict_proba(self._design(vectors))[:, 1]
+        return self.model.predict_proba(self.to_frame(vectors))[:, 1]
+
+    def predict_one(self, vector: np.ndarray) -> float:
+        """Probability of default for a single encoded feature vector"""
+        return self.predict_proba(vector)[0]
+
+    def to_frame(self, vectors: np.ndarray) -> pd.DataFrame:
+        """Rebuild the DataFrame the reference path would have produced"""
+        vectors = np.atleast_2d(vectors)
+        columns = {}
+        for name, i in self.feature_index.items():
+            if name in self.cat_cols:
+                columns[name] = vectors[:, i].astype(np.int64)
+            else:
+                columns[name] = vectors[:, i]
+        return pd.DataFrame(columns)
+
+    # Compilation
+    def _compile_design(self):
+        steps = getattr(self.model, "steps", None)
+        if not steps:
+            raise ValueError("model is not a pipeline")
+
+        # Samplers such as SMOTE only run during fit and are skipped at predict time
+        transformers = [step for _, step in steps[:-1] if not hasattr(step, "fit_resample")]
+        if len(transformers) != 1 or not hasattr(transformers[0], "transformers_"):
+            raise ValueError("expected a single fitted ColumnTransformer before the estimator")
+        column_transformer = transformers[0]
+
+        estimator = steps[-1][1]
+        if len(getattr(estimator, "classes_", [])) != 2 or not hasattr(estimator, "coef_"):
+            raise ValueError("expected a fitted binary linear classifier")
+
+        self._blocks = []
+        offset = 0
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            transformer = _unwrap(transformer)
+            positions = np.array([self.feature_index[c] for c in columns], dtype=np.intp)
+            kind = type(transformer).__name__
+
+            if kind == "StandardScaler":
+                mean = transformer.mean_ if transformer.with_mean else None
+                scale = transformer.scale_ if transformer.with_std else None
+                self._blocks.append(("scale", positions, offset, (mean, scale)))
+                offset += len(columns)
+            elif kind == "OneHotEncoder":
+                if getattr(transformer, "drop_idx_", None) is not None:
+                    raise ValueError("OneHotEncoder with drop is not supported")
+                if transformer.handle_unknown not in ("ignore", "error"):
+                    raise ValueError(f"handle_unknown={transformer.handle_unknown!r} is not supported")
+                lookups = []
+                for categories in transformer.categories_:
+                    lookups.append((offset, categories))
+                    offset += len(categories)
+                self._blocks.append(("onehot", positions, None, (lookups, transformer.handle_unknown)))
+            else:
+                raise ValueError(f"unsupported transformer {kind} in '{name}'")
+
+        if offset != estimator.coef_.shape[1]:
+            raise ValueError(f"design width {offset} does not match {estimator.coef_.shape[1]} coefficients")
+
+        self._n_design = offset
+        self._sparse = bool(getattr(column_transformer, "sparse_output_", False))
+        self._estimator = estimator
+        self._coef_t = estimator.coef_.T
+        self._intercept = estimator.intercept_
+
+    def _design(self, vectors: np.ndarray):
+        """Apply the fitted column transforms to an encoded feature matrix"""
+        design = np.zeros((vectors.shape[0], self._n_design), dtype=np.float64)
+        for kind, positions, offset, params in self._blocks:
+            if kind == "scale":
+                mean, scale = params
+                block = vectors[:, positions]
+                if mean is not None:
+                    block -= mean
+                if scale is not None:
+                    block /= scale
+                design[:, offset:offset + len(positions)] = block
+            else:
+                lookups, handle_unknown = params
+                rows = np.arange(vectors.shape[0])
+                for position, (start, categories) in zip(positions, lookups):
+                    values = vectors[:, position].astype(categories.dtype)
+                    index = np.searchsorted(categories, values)
+                    index = np.minimum(index, len(categories) - 1)
+                    found = categories[index] == values
+                    if not found.all() and handle_unknown == "error":
+                        raise ValueError(f"Found unknown categories in column {position}")
+                    design[rows[found], start + index[found]] = 1.0
+        if self._sparse:
+            from scipy import sparse
+            return sparse.csr_matrix(design)
+        return design
+
+    def _probe_vectors(self) -> np.ndarray:
+        """Probe rows covering every category code and a spread of numeric values"""
+        width = max(len(encoder.classes_) for encoder in self.label_encoders.values())
+        probes = np.zeros((max(width, 4), self.n_features), dtype=np.float64)
+        for name, i in self.feature_index.items():
+            if name in self.cat_cols:
+                n_classes = len(self.label_encoders[name].classes_)
+                probes[:, i] = np.arange(len(probes)) % n_classes
+            else:
+                probes[:, i] = np.linspace(0.0, 1000.0 * (i + 1), len(probes))
+        return probes
+
+    def _select_mode(self) -> str:
+        probes = self._probe_vectors()
+        try:
+            reference = np.array([
+                self.model.predict_proba(self.to_frame(probe))[0][1] for probe in probes
+            ])
+        except Exception as e:
+            logger.warning(f"Reference path failed on probe rows, using frame scoring: {str(e)}")
+            return "frame"
+        for mode in ("linear", "estimator"):
+            self.mode = mode
+            try:
+                candidate = np.array([self.predict_one(probe) for probe in probes])
+            except Exception as e:
+                logger.warning(f"Scorer mode '{mode}' failed on probe rows: {str(e)}")
+                continue
+            if np.array_equal(candidate, reference):
+                return mode
+            logger.warning(f"Scorer mode '{mode}' is not bit-identical to the reference path")
+        return "frame"
+
+
+def build_scorer(
+    model_data: dict,
+    feature_mapping: Dict[str, str],
+    encoder: Optional[CategoryEncoder] = None
+) -> Optional[CompiledScorer]:
+    """Build the fast-path scorer, or return None if it cannot be compiled"""
+    try:
+        return CompiledScorer(model_data, feature_mapping, encoder)
+    except Exception as e:
+        logger.error(f"Failed to build compiled scorer: {str(e)}")
+        return None
@@ -1,43 +1,50 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import json
+import asyncio
+import hmac
+import time
+from urllib.parse import quote
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import WebSocket, WebSocketDisconnect
-from passlib.context import CryptContext
-from .pdf_generator import PDFGenerator
+from .pdf_generator import PDFGenerator, ReportCache, report_key
+from .report_export import EXPORT_MAX_REPORTS, EXPORT_PDF_MAX_REPORTS, report_exporter
 import os
 from sqlalchemy.orm import Session
-import joblib
+from sqlalchemy.ext.asyncio import AsyncSession
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
-from typing import Optional, List
-from pydantic import BaseModel, Field
-from . import schemas, crud, auth
-from typing import List
-from .database import SessionLocal, engine, Base
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                self.disconnect(connection)
-
-manager = ConnectionManager()
+from typing import Optional, List, Literal
+from pydantic import BaseModel, Field, ValidationError
+from . import models, schemas, crud, async_crud, auth
+from .dependencies import get_current_user, get_optional_user, resolve_user
+from .inference import UNSEEN_CATEGORY_FALLBACK
+from .model_artifact import DEFAULT_MODEL_PATH, ArtifactError, LoadedModel
+from .model_registry import ModelRegistry, ModelValidationError
+from .executors import BoundedExecutor, ExecutorSaturated
+from .batching import MicroBatcher
+from .metrics import metrics, render_gauges
+from .write_behind import WRITE_BEHIND_ENABLED, prediction_writer
+from .crud import prediction_rows
+from .result_cache import ResultCache, ScoreResult, result_key, score_result
+from .portfolio import portfolio_stats
+from .database import SessionLocal, AsyncSessionLocal, engine, async_engine, Base, get_db, get_async_db, pool_stats
+from .migrations import run_migrations
+from .scoring import (
+    FEATURE_MAPPING,
+    calculate_credit_score,
+    determine_decision,
+    determine_risk_level,
+    encode_frame,
+    predict_default_proba,
+    preprocess_frame,
+    preprocess_record,
+)
+from .broadcast import Subscription, Topic, hub
+from .pubsub import create_backend
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,13 +52,10 @@ logger = logging.getLogger(__name__)
 
 # Initialize database
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI()
 
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -59,28 +63,128 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Bounded worker pools keeping model inference and blocking DB work off the event loop
+EXECUTOR_RETRY_AFTER = int(os.getenv("EXECUTOR_RETRY_AFTER", "1"))
+inference_executor = BoundedExecutor(
+    "inference",
+    max_workers=int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv("INFERENCE_QUEUE_DEPTH", "64")),
+    retry_after=EXECUTOR_RETRY_AFTER
+)
+db_executor = BoundedExecutor(
+    "db",
+    max_workers=int(os.getenv("DB_EXECUTOR_WORKERS", "8")),
+    max_queue=int(os.getenv("DB_EXECUTOR_QUEUE_DEPTH", "128")),
+    retry_after=EXECUTOR_RETRY_AFTER
+)
+report_executor = BoundedExecutor(
+    "report",
+    max_workers=int(os.getenv("REPORT_WORKERS", "2")),
+    max_queue=int(os.getenv("REPORT_QUEUE_DEPTH", "32")),
+    retry_after=EXECUTOR_RETRY_AFTER
 )
 
-# Database dependency
-def get_db():
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    inference_executor.shutdown(wait=False)
+    db_executor.shutdown(wait=False)
+    report_executor.shutdown(wait=False)
+    auth.password_executor.shutdown(wait=False)
+    report_exporter.shutdown()
+
+# In-memory portfolio aggregates, seeded at startup and reconciled against the DB
+PORTFOLIO_RECONCILE_SECONDS = float(os.getenv("PORTFOLIO_RECONCILE_SECONDS", "60"))
+
+def reconcile_portfolio_stats():
     db = SessionLocal()
     try:
-        yield db
+        portfolio_stats.load(crud.get_prediction_stats_by_user(db))
     finally:
         db.close()
 
-# Load model and encoders
+async def portfolio_reconcile_loop():
+    while True:
+        await asyncio.sleep(PORTFOLIO_RECONCILE_SECONDS)
+        try:
+            await db_executor.run(reconcile_portfolio_stats)
+        except Exception as e:
+            logger.error(f"Portfolio reconciliation failed: {str(e)}")
+
+@app.on_event("startup")
+async def seed_portfolio_stats():
+    try:
+        await db_executor.run(reconcile_portfolio_stats)
+        logger.info(f"Portfolio stats seeded with {portfolio_stats.count()} predictions")
+    except Exception as e:
+        logger.error(f"Failed to seed portfolio stats: {str(e)}")
+    if PORTFOLIO_RECONCILE_SECONDS > 0:
+        app.state.portfolio_reconcile_task = asyncio.create_task(portfolio_reconcile_loop())
+
+@app.on_event("startup")
+async def start_prediction_writer():
+    if WRITE_BEHIND_ENABLED:
+        await prediction_writer.start()
+
+# Registered before the engine is disposed so queued predictions are drained first
+@app.on_event("shutdown")
+async def stop_prediction_writer():
+    await prediction_writer.stop()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+async def stop_portfolio_reconcile():
+    task = getattr(app.state, "portfolio_reconcile_task", None)
+    if task is not None:
+        task.cancel()
+
+@app.on_event("startup")
+async def start_broadcast_hub():
+    await hub.start(create_backend())
+
+@app.on_event("shutdown")
+async def stop_broadcast_hub():
+    await hub.stop()
+
+# Load model and encoders; MODEL_PATH is a joblib pickle or an array artifact directory
+MODEL_PATH = os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+USE_FAST_SCORING = os.getenv("USE_FAST_SCORING", "true").lower() in ['yes', 'true', '1']
+# Seconds between checks of MODEL_PATH for a new artifact; 0 disables hot reload polling
+MODEL_RELOAD_POLL_SECONDS = float(os.getenv("MODEL_RELOAD_POLL_SECONDS", "0"))
+# Shared secret for the model admin endpoints; unset disables them
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+model_registry = ModelRegistry(FEATURE_MAPPING, fallback=UNSEEN_CATEGORY_FALLBACK, compile_scorer=USE_FAST_SCORING)
 try:
-    model_data = joblib.load('app/credit_scoring_model.pkl')
-    model = model_data['model']
-    label_encoders = model_data['label_encoders']
-    num_cols = model_data['num_cols']
-    cat_cols = model_data['cat_cols']
-    logger.info("Model and encoders loaded successfully")
+    loaded_model = model_registry.load_initial(MODEL_PATH)
+    logger.info(f"Model {loaded_model.version} loaded successfully from {MODEL_PATH} ({loaded_model.artifact_format})")
 except Exception as e:
     logger.error(f"Failed to load model: {str(e)}")
     raise RuntimeError(f"Model loading failed: {str(e)}")
 
+@app.on_event("startup")
+async def start_model_poll():
+    if MODEL_RELOAD_POLL_SECONDS > 0:
+        app.state.model_poll_task = asyncio.create_task(model_registry.poll(MODEL_PATH, MODEL_RELOAD_POLL_SECONDS))
+
+@app.on_event("shutdown")
+async def stop_model_poll():
+    task = getattr(app.state, "model_poll_task", None)
+    if task is not None:
+        task.cancel()
+
 # Pydantic models
 class CreditApplication(BaseModel):
     client_name: str = Field(default="Applicant")
@@ -114,6 +218,35 @@ class CreditScoreResponse(BaseModel):
     modelVersion: str
     timestamp: str
 
+class BatchPredictionRequest(BaseModel):
+    applications: List[dict]
+
+class BatchPredictionResult(BaseModel):
+    index: int
+    client: Optional[str] = None
+    creditScore: Optional[int] = None
+    riskLevel: Optional[str] = None
+    approvalProbability: Optional[str] = None
+    decision: Optional[str] = None
+    predictionId: Optional[int] = None
+    errors: Optional[List[str]] = None
+
+class BatchPredictionResponse(BaseModel):
+    total: int
+    scored: int
+    failed: int
+    results: List[BatchPredictionResult]
+    modelVersion: str
+    timestamp: str
+
+class ReportExportRequest(BaseModel):
+    prediction_ids: Optional[List[int]] = None
+    risk_level: Optional[str] = None
+    decision: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    format: Literal["zip", "pdf"] = "zip"
+
 class RecentAnalysis(BaseModel):
     id: int
     client_name: str
@@ -122,38 +255,46 @@ class RecentAnalysis(BaseModel):
     decision: str
     timestamp: str
 
-# Feature mapping
-FEATURE_MAPPING = {
-    "age": "age",
-    "income": "income",
-    "loanAmount": "loan_amount",
-    "interestRate": "interest_rate",
-    "turnover": "turnover",
-    "customerTenure": "customer_tenure",
-    "avgDaysLateCurrent": "avg_days_late_current",
-    "numLatePaymentsCurrent": "num_late_payments_current",
-    "unpaidAmount": "unpaid_amount",
-    "industrySector": "industry_sector",
-    "creditType": "credit_type",
-    "hasGuarantee": "has_guarantee",
-    "guaranteeType": "guarantee_type",
-    "repaymentFrequency": "repayment_frequency"
-}
+# Results of recently scored feature vectors, so resubmissions skip inference; 0 disables it
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+result_cache = ResultCache(RESULT_CACHE_SIZE)
+
+# Micro-batching of concurrent /predict calls through the compiled scorer; a window of 0 disables it
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "0"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+micro_batcher = None
+if loaded_model.scorer is not None and MICROBATCH_WINDOW_MS > 0:
+    micro_batcher = MicroBatcher(
+        loaded_model.scorer.predict_proba,
+        inference_executor,
+        window_ms=MICROBATCH_WINDOW_MS,
+        max_batch_size=MICROBATCH_MAX_SIZE
+    )
+
+# Upper bound on applications accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "5000"))
 
 # Authentication endpoints
 @app.post("/register", response_model=schemas.User)
 async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await db_executor.run(crud.get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create the user
-    return crud.create_user(db=db, user=user)
+    # Create the user; hashing runs in the password pool, not on the event loop
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await db_executor.run(crud.create_user, db, user, hashed_password=hashed_password)
 @app.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await db_executor.run(crud.get_user_by_email, db, form_data.username)
+    valid = False
+    if user:
+        valid, new_hash = await auth.verify_and_update_password_async(form_data.password, user.hashed_password)
+        if valid and new_hash:
+            # Stored hash used a different bcrypt cost; upgrade it transparently
+            await db_executor.run(crud.set_password_hash, db, user, new_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -180,124 +321,126 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return response
 
 @app.get("/users/me", response_model=schemas.User)
-async def read_users_me(request: Request, db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    token = request.headers.get("Authorization")
-    if not token:
-        raise credentials_exception
-    try:
-        token = token.split(" ")[1] if " " in token else token
-        email = await auth.verify_token(token)
-        if email is None:
-            raise credentials_exception
-        user = crud.get_user_by_email(db, email=email)
-        if user is None:
-            raise credentials_exception
-        return user
-    except Exception as e:
-        logger.error(f"Authentication error: {str(e)}")
-        raise credentials_exception
+async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
+    return current_user
 
-# Helper functions
-def preprocess_input(data: dict) -> pd.DataFrame:
+# Helper functions; each takes the model snapshot a request started with, defaulting to the active one
+def preprocess_input(data: dict, loaded: Optional[LoadedModel] = None) -> pd.DataFrame:
     """Convert form data to model input format"""
-    input_dict = {}
-    
-    for form_field, model_feature in FEATURE_MAPPING.items():
-        if form_field in data:
-            if model_feature in num_cols:
-                input_dict[model_feature] = float(data[form_field])
-            elif model_feature == 'has_guarantee':
-                input_dict[model_feature] = 1 if str(data[form_field]).lower() in ['yes', 'true', '1'] else 0
+    loaded = loaded or model_registry.active
+    return preprocess_record(data, loaded.num_cols)
+
+def encode_categorical_features(df: pd.DataFrame, loaded: Optional[LoadedModel] = None) -> pd.DataFrame:
+    """Encode categorical features using the precomputed lookup tables with proper unknown value handling"""
+    loaded = loaded or model_registry.active
+    # Unseen categories map to the configured fallback code
+    return encode_frame(df, loaded.encoder, loaded.cat_cols)
+
+def preprocess_batch(records: List[dict], loaded: Optional[LoadedModel] = None) -> pd.DataFrame:
+    """Convert a list of form payloads to a columnar model input frame"""
+    loaded = loaded or model_registry.active
+    return preprocess_frame(pd.DataFrame.from_records(records), loaded.num_cols)
+
+def encode_categorical_features_batch(df: pd.DataFrame, loaded: Optional[LoadedModel] = None) -> pd.DataFrame:
+    """Encode every categorical column of a multi-row frame in one vectorized pass"""
+    loaded = loaded or model_registry.active
+    return encode_frame(df, loaded.encoder, loaded.cat_cols)
+
+def score_application(app_data: dict, loaded: Optional[LoadedModel] = None) -> ScoreResult:
+    """Score one application, reusing the cached result for identical encoded features"""
+    loaded = loaded or model_registry.active
+    if loaded.scorer is not None:
+        with metrics.timed("vectorize"):
+            features = loaded.scorer.vectorize(app_data)
+            feature_values = loaded.scorer.feature_dict(features)
+    else:
+        with metrics.timed("preprocess_input"):
+            input_df = preprocess_input(app_data, loaded)
+        with metrics.timed("encode_categorical_features"):
+            input_df = encode_categorical_features(input_df, loaded)
+        feature_values = input_df.iloc[0].to_dict()
+
+    key = result_key(loaded, feature_values)
+    result = result_cache.get(key)
+    if result is None:
+        with metrics.timed("predict_proba"):
+            if loaded.scorer is not None:
+                prob_default = loaded.scorer.predict_one(features)
             else:
-                input_dict[model_feature] = str(data[form_field])
-    
-    return pd.DataFrame([input_dict])
-
-def encode_categorical_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Encode categorical features using saved label encoders with proper unknown value handling"""
-    for col in cat_cols:
-        if col in df.columns:
-            raw_value = df[col].iloc[0]
-            str_value = str(raw_value) if not pd.isna(raw_value) else "missing"
-            
-            # Handle unseen categories by using the most frequent category
-            if str_value not in label_encoders[col].classes_:
-                logger.warning(f"Unseen category '{str_value}' in column '{col}', using most frequent category")
-                str_value = label_encoders[col].classes_[0]
-            
-            df[col] = label_encoders[col].transform([str_value])[0]
-    
-    return df
-
-def calculate_credit_score(prob_default: float) -> int:
-    """Convert probability of default to credit score (300-850)"""
-    odds = (1 - prob_default) / (prob_default + 1e-9)
-    score = 300 + (50 * np.log10(odds))
-    return int(np.clip(score, 300, 850))
-
-def determine_risk_level(score: int) -> str:
-    """Categorize risk based on credit score"""
-    if score >= 750:
-        return "Very Low"
-    elif score >= 650:
-        return "Low"
-    elif score >= 550:
-        return "Medium"
-    elif score >= 450:
-        return "High"
-    return "Very High"
-
-def get_key_factors(input_data: dict) -> dict:
-    """Generate key positive/negative factors for decision"""
-    factors = {"positive": [], "negative": []}
-    
-    if input_data.get('income', 0) > 100000:
-        factors["positive"].append("High income")
-    if input_data.get('customer_tenure', 0) > 24:
-        factors["positive"].append("Long customer tenure")
-    
-    if input_data.get('avg_days_late_current', 0) > 15:
-        factors["negative"].append("Frequent late payments")
-    if input_data.get('num_late_payments_current', 0) > 3:
-        factors["negative"].append("Multiple late payments")
-    
-    debt_ratio = input_data.get('loan_amount', 0) / max(input_data.get('income', 1), 1)
-    if debt_ratio > 0.35:
-        factors["negative"].append(f"High debt ratio ({debt_ratio:.0%})")
-    
-    return factors
+                prob_default = loaded.model.predict_proba(input_df)[0][1]
+        result = result_cache.put(key, score_result(prob_default, feature_values))
+    return result
+
+def score_applications(records: List[dict], loaded: Optional[LoadedModel] = None) -> np.ndarray:
+    """Probabilities of default for many applications with one model call"""
+    loaded = loaded or model_registry.active
+    # Array artifacts carry no sklearn model and go through the compiled linear scorer
+    return predict_default_proba(loaded, pd.DataFrame.from_records(records))
+
+def broadcast_prediction(
+    prediction_id: int,
+    prediction_data: dict,
+    user_id: Optional[int],
+    user_email: Optional[str],
+    total_clients: Optional[int] = None
+):
+    """Publish a saved prediction to the WebSocket subscribers of its topic"""
+    start = time.perf_counter()
+    if total_clients is None and portfolio_stats.seeded:
+        total_clients = portfolio_stats.count(user_id)
+    broadcast_data = {
+        "type": "new_prediction",
+        "data": {
+            "id": prediction_id,
+            "user_email": user_email,  # Using email instead of ID
+            "client_name": prediction_data["client_name"],
+            "credit_score": prediction_data["credit_score"],
+            "risk_level": prediction_data["risk_level"],
+            "decision": prediction_data["decision"],
+            "timestamp": datetime.now().isoformat(),
+            "total_clients": total_clients
+        }
+    }
+    logger.debug("Broadcasting prediction: %s", broadcast_data)
+    hub.publish(broadcast_data, Topic(user_id, prediction_data["risk_level"], prediction_data["decision"]))
+    metrics.observe_stage("broadcast", time.perf_counter() - start)
 
 # Prediction endpoint
 @app.post("/predict", response_model=CreditScoreResponse)
-async def predict_credit_score(request: Request, application: CreditApplication, db: Session = Depends(get_db)):
+async def predict_credit_score(
+    application: CreditApplication,
+    user: Optional[schemas.User] = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    start = time.perf_counter()
     try:
         logger.info(f"Starting prediction for {application.client_name}")
-        
-        # Authentication and user handling
-        user = None
-        token = request.headers.get("Authorization")
-        if token:
-            try:
-                token = token.split(" ")[1] if " " in token else token
-                email = await auth.verify_token(token)
-                user = crud.get_user_by_email(db, email=email)
-                logger.info(f"Authenticated user: {email} (ID: {user.id if user else 'None'})")
-            except Exception as e:
-                logger.warning(f"Token verification failed: {str(e)}")
+        if user:
+            logger.info(f"Authenticated user: {user.email} (ID: {user.id})")
 
-        # Prediction logic
+        user_id = user.id if user else None
+        user_email = user.email if user else None
+
+        # Make prediction with one model snapshot, even if a reload swaps it meanwhile
+        loaded = model_registry.active
         app_data = application.dict()
-        input_df = preprocess_input(app_data)
-        input_df = encode_categorical_features(input_df)
-        
-        # Make prediction
-        prob_default = model.predict_proba(input_df)[0][1]
-        score = calculate_credit_score(prob_default)
+        if micro_batcher is not None and loaded.scorer is not None:
+            with metrics.timed("vectorize"):
+                features = loaded.scorer.vectorize(app_data)
+                feature_values = loaded.scorer.feature_dict(features)
+            key = result_key(loaded, feature_values)
+            result = result_cache.get(key)
+            if result is None:
+                # Queue wait plus the shared predict_proba call
+                with metrics.timed("micro_batch"):
+                    prob_default = await micro_batcher.submit(features, loaded.scorer.predict_proba)
+                result = result_cache.put(key, score_result(prob_default, feature_values))
+        else:
+            # Executor queue wait plus the stages recorded inside score_application
+            with metrics.timed("inference"):
+                result = await inference_executor.run(score_application, app_data, loaded)
+        prob_default = result.prob_default
+        score = result.credit_score
         approval_prob = 100 * (1 - prob_default)
         
         # Prepare prediction data
@@ -305,43 +448,40 @@ async def predict_credit_score(request: Request, application: CreditApplication,
             "client_name": application.client_name,
             "credit_score": score,
             "risk_level": determine_risk_level(score).lower(),
-            "decision": "approved" if score >= 650 else "approved with conditions" if score >= 550 else "declined",
+            "decision": determine_decision(score),
             "income": application.income,
             "loan_amount": application.loanAmount,
             "interest_rate": application.interestRate,
             "employment": application.employment,
             "loan_purpose": application.loanPurpose
         }
-        logger.info(f"Prediction data prepared: {prediction_data}")
+        # Lazy formatting: the dict is only rendered when debug logging is on
+        logger.debug("Prediction data prepared: %s", prediction_data)
 
-        # Save to database
-        try:
-            prediction = crud.create_prediction(
-                db, 
-                schemas.PredictionCreate(**prediction_data),
-                user_id=user.id if user else None
-            )
-            logger.info(f"Prediction saved to DB with ID: {prediction.id}")
-        except Exception as e:
-            logger.error(f"Failed to save prediction: {str(e)}")
-            raise
-
-        # Broadcast via WebSocket
-        broadcast_data = {
-            "type": "new_prediction",
-            "data": {
-                "id": prediction.id,
-                "user_email": user.email if user else None,  # Using email instead of ID
-                "client_name": application.client_name,
-                "credit_score": score,
-                "risk_level": prediction_data["risk_level"],
-                "decision": prediction_data["decision"],
-                "timestamp": datetime.now().isoformat(),
-                "total_clients": crud.get_user_prediction_count(db, user_id=user.id if user else None)
-            }
-        }
-        logger.info(f"Broadcasting prediction: {broadcast_data}")
-        await manager.broadcast(broadcast_data)
+        prediction_create = schemas.PredictionCreate(**prediction_data)
+        if prediction_writer.running:
+            # Write-behind: the row is inserted in a later batch and broadcast once it has an id
+            with metrics.timed("enqueue_prediction"):
+                await prediction_writer.submit(
+                    prediction_rows([prediction_create], user_id)[0],
+                    on_saved=lambda prediction_id: broadcast_prediction(prediction_id, prediction_data, user_id, user_email)
+                )
+        else:
+            # Save to database
+            try:
+                with metrics.timed("create_prediction"):
+                    prediction = await async_crud.create_prediction(db, prediction_create, user_id=user_id)
+                logger.info(f"Prediction saved to DB with ID: {prediction.id}")
+            except Exception as e:
+                logger.error(f"Failed to save prediction: {str(e)}")
+                raise
+
+            if portfolio_stats.seeded:
+                total_clients = portfolio_stats.count(user_id)
+            else:
+                with metrics.timed("count_query"):
+                    total_clients = await async_crud.get_user_prediction_count(db, user_id=user_id)
+            broadcast_prediction(prediction.id, prediction_data, user_id, user_email, total_clients)
 
         # Prepare response
         response = {
@@ -350,45 +490,150 @@ async def predict_credit_score(request: Request, application: CreditApplication,
             "riskLevel": prediction_data["risk_level"],
             "approvalProbability": f"{approval_prob:.1f}%",
             "decision": prediction_data["decision"],
-            "keyFactors": get_key_factors(input_df.iloc[0].to_dict()),
-            "modelVersion": "1.0",
+            "keyFactors": result.key_factors,
+            "modelVersion": loaded.version,
             "timestamp": datetime.now().isoformat()
         }
-        
+        metrics.observe_stage("predict_total", time.perf_counter() - start)
+        metrics.increment("predictions", outcome="ok")
         return response
     
+    except ExecutorSaturated:
+        metrics.increment("predictions", outcome="busy")
+        raise
     except Exception as e:
+        metrics.increment("predictions", outcome="error")
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_credit_score_batch(
+    batch: BatchPredictionRequest,
+    user: Optional[schemas.User] = Depends(get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """Score many applications with a single model call and bulk-insert the results"""
+    if not batch.applications:
+        raise HTTPException(status_code=400, detail="No applications provided")
+    if len(batch.applications) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the limit of {MAX_BATCH_SIZE} applications"
+        )
+
+    try:
+        logger.info(f"Starting batch prediction for {len(batch.applications)} applications")
+
+        # Validate every row up front; invalid rows are reported, not fatal
+        results = [BatchPredictionResult(index=i) for i in range(len(batch.applications))]
+        valid_indices = []
+        applications = []
+        for i, raw_application in enumerate(batch.applications):
+            try:
+                applications.append(CreditApplication(**raw_application))
+                valid_indices.append(i)
+            except ValidationError as e:
+                results[i].errors = [
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                ]
+            except TypeError as e:
+                results[i].errors = [str(e)]
+
+        # Score all valid rows at once
+        loaded = model_registry.active
+        to_insert = []
+        if applications:
+            with metrics.timed("batch_score"):
+                prob_defaults = await inference_executor.run(
+                    score_applications, [application.dict() for application in applications], loaded
+                )
+
+            for i, application, prob_default in zip(valid_indices, applications, prob_defaults):
+                score = calculate_credit_score(prob_default)
+                result = results[i]
+                result.client = application.client_name
+                result.creditScore = score
+                result.riskLevel = determine_risk_level(score).lower()
+                result.approvalProbability = f"{100 * (1 - prob_default):.1f}%"
+                result.decision = determine_decision(score)
+
+                try:
+                    to_insert.append((i, schemas.PredictionCreate(
+                        client_name=application.client_name,
+                        credit_score=score,
+                        risk_level=result.riskLevel,
+                        decision=result.decision,
+                        income=application.income,
+                        loan_amount=application.loanAmount,
+                        interest_rate=application.interestRate,
+                        employment=application.employment,
+                        loan_purpose=application.loanPurpose
+                    )))
+                except ValidationError as e:
+                    result.errors = [
+                        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                    ]
+
+        # Save all storable rows in one transaction
+        if to_insert:
+            with metrics.timed("batch_insert"):
+                prediction_ids = await db_executor.run(
+                    crud.create_predictions_bulk,
+                    db,
+                    [prediction for _, prediction in to_insert],
+                    user_id=user.id if user else None
+                )
+            for (i, _), prediction_id in zip(to_insert, prediction_ids):
+                results[i].predictionId = prediction_id
+
+        failed = sum(1 for result in results if result.errors)
+        metrics.increment("batch_rows", len(results) - failed, outcome="scored")
+        metrics.increment("batch_rows", failed, outcome="failed")
+        logger.info(f"Batch prediction finished: {len(results) - failed} scored, {failed} failed")
+
+        return {
+            "total": len(results),
+            "scored": len(results) - failed,
+            "failed": failed,
+            "results": results,
+            "modelVersion": loaded.version,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except (HTTPException, ExecutorSaturated):
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
 @app.get("/predictions", response_model=List[schemas.Prediction])
 async def get_predictions(
-    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get historical predictions for the authenticated user"""
+    """
+    Get historical predictions for the authenticated user, newest first.
+    Pass the X-Next-Cursor header of a page as `after` to fetch the next one;
+    `after` replaces `skip`, so the two cannot be combined.
+    """
+    if after is not None and skip:
+        raise HTTPException(status_code=400, detail="Use either skip or after, not both")
     try:
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authorization header missing"
-            )
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        email = await auth.verify_token(token)
-        user = crud.get_user_by_email(db, email=email)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid user"
+        try:
+            predictions = await async_crud.get_predictions(
+                db, user_id=user.id, skip=skip, limit=limit, after=after
             )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
         
-        predictions = crud.get_predictions(db, user_id=user.id, skip=skip, limit=limit)
+        if len(predictions) == limit:
+            response.headers["X-Next-Cursor"] = crud.encode_cursor(predictions[-1])
         return predictions
     
-    except HTTPException:
+    except (HTTPException, ExecutorSaturated):
         raise
     except Exception as e:
         logger.error(f"Error fetching predictions: {str(e)}")
@@ -399,28 +644,12 @@ async def get_predictions(
 
 @app.get("/recent-analyses", response_model=List[schemas.RecentAnalysis])
 async def get_recent_analyses(
-    request: Request,
-    db: Session = Depends(get_db)
+    user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get recent analyses for the authenticated user"""
     try:
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authorization header missing"
-            )
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        email = await auth.verify_token(token)
-        user = crud.get_user_by_email(db, email=email)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid user"
-            )
-        
-        recent_analyses = crud.get_recent_analyses(db, user_id=None)  # Changed from None to user.id
+        recent_analyses = await async_crud.get_recent_analyses(db, user_id=user.id)
         
         # Convert to the format expected by the frontend
         return [
@@ -444,106 +673,81 @@ async def get_recent_analyses(
             detail="Failed to fetch recent analyses"
         )
 
+def build_dashboard_stats(stats: dict) -> dict:
+    """Turn prediction aggregates into the dashboard payload"""
+    total = stats["total"]
+    if not total:
+        return {
+            "total_clients": 0,
+            "average_score": 0,
+            "high_risk_clients": 0,
+            "portfolio_risk": "Low",
+            "approval_rate": 0,
+            "default_rate": 0,
+            "model_accuracy": 0,
+            "score_distribution": [
+                {"name": "High (300-579)", "count": 0},
+                {"name": "Medium (580-667)", "count": 0},
+                {"name": "Low (668-850)", "count": 0}
+            ],
+            "decision_distribution": [
+                {"name": "Approved", "count": 0},
+                {"name": "Approved with Conditions", "count": 0},
+                {"name": "Declined", "count": 0}
+            ]
+        }
+    
+    high_risk = stats["high_risk"]
+    
+    # Determine portfolio risk
+    if high_risk / total > 0.2:
+        portfolio_risk = "High"
+    elif stats["medium_risk"] / total > 0.3:
+        portfolio_risk = "Medium"
+    else:
+        portfolio_risk = "Low"
+    
+    return {
+        "total_clients": total,
+        "average_score": round(stats["score_sum"] / total),
+        "high_risk_clients": high_risk,
+        "portfolio_risk": portfolio_risk,
+        "approval_rate": round((stats["approved"] / total) * 100, 1),
+        "default_rate": round((high_risk / total) * 100, 1),
+        "model_accuracy": 94.7,  # This would come from your model metrics
+        "approval_change": 2.1,   # Would need to compare with previous period
+        "default_change": -0.5,   # Would need to compare with previous period
+        "accuracy_change": 1.2,   # Would need to compare with previous period
+        "score_distribution": [
+            {"name": "High (300-579)", "count": stats["score_high_risk"]},
+            {"name": "Medium (580-667)", "count": stats["score_medium_risk"]},
+            {"name": "Low (668-850)", "count": stats["score_low_risk"]}
+        ],
+        "decision_distribution": [
+            {"name": "Approved", "count": stats["approved"]},
+            {"name": "Approved with Conditions", "count": stats["approved_with_conditions"]},
+            {"name": "Declined", "count": stats["declined"]}
+        ]
+    }
+
 @app.get("/dashboard-stats")
 async def get_dashboard_stats(
-    request: Request,
-    db: Session = Depends(get_db)
+    days: Optional[int] = None,
+    user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get dashboard statistics for the authenticated user"""
+    """Get dashboard statistics for the authenticated user, optionally over the last `days` days"""
     try:
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authorization header missing"
-            )
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        email = await auth.verify_token(token)
-        user = crud.get_user_by_email(db, email=email)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid user"
-            )
-        
-        # Get basic stats
-        total_clients = crud.get_user_prediction_count(db, user_id=None)
-        predictions = crud.get_predictions(db, user_id=None, limit=1000)
-        
-        if not predictions:
-            return {
-                "total_clients": 0,
-                "average_score": 0,
-                "high_risk_clients": 0,
-                "portfolio_risk": "Low",
-                "approval_rate": 0,
-                "default_rate": 0,
-                "model_accuracy": 0,
-                "score_distribution": [
-                    {"name": "High (300-579)", "count": 0},
-                    {"name": "Medium (580-667)", "count": 0},
-                    {"name": "Low (668-850)", "count": 0}
-                ],
-                "decision_distribution": [
-                    {"name": "Approved", "count": 0},
-                    {"name": "Approved with Conditions", "count": 0},
-                    {"name": "Declined", "count": 0}
-                ]
-            }
-        
-        # Calculate statistics
-        scores = [p.credit_score for p in predictions]
-        average_score = sum(scores) / len(scores) if scores else 0
-        
-        high_risk = len([p for p in predictions if p.risk_level.lower() in ["high", "very high"]])
-        medium_risk = len([p for p in predictions if p.risk_level.lower() == "medium"])
+        # Whole-portfolio stats come from the in-memory aggregate; windows need SQL
+        if not days and portfolio_stats.seeded:
+            return build_dashboard_stats(portfolio_stats.snapshot())
         
-        # Determine portfolio risk
-        if len(predictions) > 0:
-            if high_risk / len(predictions) > 0.2:
-                portfolio_risk = "High"
-            elif medium_risk / len(predictions) > 0.3:
-                portfolio_risk = "Medium"
-            else:
-                portfolio_risk = "Low"
-        else:
-            portfolio_risk = "Low"
-        
-        # Approval rate
-        approved = len([p for p in predictions if p.decision.lower() == "approved"])
-        approval_rate = (approved / len(predictions)) * 100 if predictions else 0
-        
-        # Score distribution
-        score_distribution = [
-            {"name": "High (300-579)", "count": len([s for s in scores if 300 <= s <= 579])},
-            {"name": "Medium (580-667)", "count": len([s for s in scores if 580 <= s <= 667])},
-            {"name": "Low (668-850)", "count": len([s for s in scores if 668 <= s <= 850])}
-        ]
-        
-        # Decision distribution
-        decision_distribution = [
-            {"name": "Approved", "count": approved},
-            {"name": "Approved with Conditions", "count": len([p for p in predictions if p.decision.lower() == "approved with conditions"])},
-            {"name": "Declined", "count": len([p for p in predictions if p.decision.lower() == "declined"])}
-        ]
-        
-        return {
-            "total_clients": total_clients,
-            "average_score": round(average_score),
-            "high_risk_clients": high_risk,
-            "portfolio_risk": portfolio_risk,
-            "approval_rate": round(approval_rate, 1),
-            "default_rate": round((high_risk / len(predictions)) * 100, 1) if predictions else 0,
-            "model_accuracy": 94.7,  # This would come from your model metrics
-            "approval_change": 2.1,   # Would need to compare with previous period
-            "default_change": -0.5,   # Would need to compare with previous period
-            "accuracy_change": 1.2,   # Would need to compare with previous period
-            "score_distribution": score_distribution,
-            "decision_distribution": decision_distribution
-        }
+        # All aggregates in one SQL round-trip over the whole table or the window
+        since = datetime.utcnow() - timedelta(days=days) if days else None
+        stats = await async_crud.get_prediction_stats(db, since=since)
+        return build_dashboard_stats(stats)
     
-    except HTTPException:
+    except (HTTPException, ExecutorSaturated):
         raise
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
@@ -555,7 +759,41 @@ async def get_dashboard_stats(
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "model_loaded": model is not None}
+    return {
+        "status": "healthy",
+        "model_loaded": model_registry.active is not None,
+        "model_version": model_registry.version
+    }
+
+# Model admin endpoints; each worker process has its own registry, so these only affect the worker
+# that serves the request. Set MODEL_RELOAD_POLL_SECONDS to roll a new artifact out to every worker.
+class ModelReloadRequest(BaseModel):
+    path: Optional[str] = None
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    if not MODEL_ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin_token)])
+async def reload_model(request: Optional[ModelReloadRequest] = None):
+    """Load, validate and activate a model artifact in this worker"""
+    path = (request.path if request is not None else None) or MODEL_PATH
+    try:
+        loaded = await model_registry.reload(path)
+    except ModelValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except (ArtifactError, OSError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not load model: {str(e)}")
+    return {"status": "reloaded", "pid": os.getpid(), "model": loaded.info()}
+
+@app.post("/admin/model/rollback", dependencies=[Depends(require_admin_token)])
+async def rollback_model():
+    """Reactivate the model that was active before the last reload in this worker"""
+    try:
+        restored = model_registry.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return {"status": "rolled back", "pid": os.getpid(), "model": restored.info()}
 @app.post("/refresh-token")
 async def refresh_token(request: Request, db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
@@ -576,7 +814,7 @@ async def refresh_token(request: Request, db: Session = Depends(get_db)):
             raise credentials_exception
             
         # Get user
-        user = crud.get_user_by_email(db, email=email)
+        user = await db_executor.run(crud.get_user_by_email, db, email=email)
         if user is None:
             raise credentials_exception
             
@@ -601,22 +839,46 @@ async def refresh_token(request: Request, db: Session = Depends(get_db)):
     except Exception as e:
         logger.error(f"Token refresh error: {str(e)}")
         raise credentials_exception
+def build_subscription(user_id: Optional[int], scope: Optional[str], risk_level, decision) -> Subscription:
+    """
+    Authenticated clients get their own events plus the shared anonymous
+    stream, or only their own with scope=own; anonymous clients get the shared
+    stream. risk_level/decision accept a list or a comma-separated string.
+    """
+    def _split(value):
+        if isinstance(value, str):
+            return value.split(",")
+        return value
+
+    owners = {user_id} if user_id is not None and scope == "own" else {user_id, None}
+    return Subscription(owners, risk_levels=_split(risk_level), decisions=_split(decision))
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, token: str = None):
-    # Verify token if provided
+async def websocket_endpoint(
+    websocket: WebSocket,
+    token: str = None,
+    scope: str = None,
+    risk_level: str = None,
+    decision: str = None
+):
+    # Verify token if provided and remember whose events this socket may see
+    user_id = None
     if token:
         try:
-            email = await auth.verify_token(token)
-            if not email:
+            async with AsyncSessionLocal() as db:
+                user = await resolve_user(token, db)
+            if user is None:
                 await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
                 return
+            user_id = user.id
         except Exception as e:
             logger.error(f"WebSocket token verification failed: {str(e)}")
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
     
-    await manager.connect(websocket)
-    logger.info(f"New WebSocket connection established. Total connections: {len(manager.active_connections)}")
+    subscription = build_subscription(user_id, scope, risk_level, decision)
+    client = await hub.connect(websocket, subscription, user_id=user_id)
+    logger.info(f"New WebSocket connection established. Total connections: {len(hub.clients)}")
     
     try:
         while True:
@@ -626,7 +888,17 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             try:
                 message = json.loads(data)
                 if message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                    # Goes through the client's queue so it never interleaves with a broadcast send
+                    hub.send(client, {"type": "pong"})
+                elif message.get("type") == "subscribe":
+                    subscription = build_subscription(
+                        user_id,
+                        message.get("scope"),
+                        message.get("risk_level"),
+                        message.get("decision")
+                    )
+                    hub.subscribe(client, subscription)
+                    hub.send(client, {"type": "subscribed", "subscription": subscription.describe()})
             except json.JSONDecodeError:
                 logger.warning("Received invalid JSON message")
                 
@@ -635,24 +907,16 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
     finally:
-        manager.disconnect(websocket)
-        logger.info(f"WebSocket connection closed. Remaining connections: {len(manager.active_connections)}")
+        await hub.disconnect(client)
+        logger.info(f"WebSocket connection closed. Remaining connections: {len(hub.clients)}")
         
 @app.get("/debug/predictions")
 async def debug_predictions(
-    request: Request,
+    user: schemas.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Debug endpoint to view all predictions"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-    email = await auth.verify_token(token)
-    user = crud.get_user_by_email(db, email=email)
-    
-    predictions = db.query(models.Prediction).all()
+    predictions = await db_executor.run(db.query(models.Prediction).all)
     return [
         {
             "id": p.id,
@@ -666,10 +930,70 @@ async def debug_predictions(
         for p in predictions
     ]
 
+@app.get("/debug/inference")
+async def debug_inference():
+    """Debug endpoint to view scoring path and unseen-category counters"""
+    return {
+        "model": model_registry.stats(),
+        "scorer_mode": model_registry.active.info()["scorer_mode"],
+        "unseen_categories": model_registry.active.encoder.stats(),
+        "executors": {
+            "inference": inference_executor.stats(),
+            "db": db_executor.stats(),
+            "report": report_executor.stats(),
+            "password": auth.password_executor.stats()
+        },
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else None,
+        "write_behind": prediction_writer.stats(),
+        "stages": metrics.snapshot(),
+        "result_cache": result_cache.stats(),
+        "token_cache": auth.token_cache.stats()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms, counters and pool/queue gauges in Prometheus text format"""
+    executors = {
+        "inference": inference_executor.stats(),
+        "db": db_executor.stats(),
+        "report": report_executor.stats(),
+        "password": auth.password_executor.stats()
+    }
+    cache = result_cache.stats()
+    writer = prediction_writer.stats()
+    pools = pool_stats()
+    websockets = hub.stats()
+
+    lines = metrics.render()
+    lines += render_gauges("executor_in_flight", "Tasks running or queued per executor", {name: stats["in_flight"] for name, stats in executors.items()}, "executor")
+    lines += render_gauges("executor_queued", "Tasks waiting for a worker per executor", {name: stats["queued"] for name, stats in executors.items()}, "executor")
+    lines += render_gauges("executor_rejected_total", "Tasks rejected because the executor was saturated", {name: stats["rejected"] for name, stats in executors.items()}, "executor", kind="counter")
+    lines += render_gauges("result_cache_lookups_total", "Result cache lookups by outcome", {"hit": cache["hits"], "miss": cache["misses"]}, "result", kind="counter")
+    lines += render_gauges("write_behind_queue_depth", "Predictions waiting to be inserted", {"predictions": writer["queue_depth"]}, "queue")
+    lines += render_gauges("write_behind_rows_total", "Write-behind rows by outcome", {"written": writer["written"], "spooled": writer["spooled"]}, "outcome", kind="counter")
+    lines += render_gauges("db_pool_checked_out", "Connections checked out of each pool", {"sync": pools.get("checked_out"), "async": pools["async"].get("checked_out")}, "pool")
+    lines += render_gauges("db_pool_timeouts_total", "Pool checkouts that timed out", {"sync": pools["timeouts"], "async": pools["async"]["timeouts"]}, "pool", kind="counter")
+    lines += render_gauges("websocket_connections", "Open WebSocket connections", {"hub": websockets["connections"]}, "source")
+    lines += render_gauges("websocket_messages_dropped_total", "Broadcast messages dropped for slow clients", {"hub": websockets["messages_dropped"]}, "source", kind="counter")
+    if micro_batcher is not None:
+        batching = micro_batcher.stats()
+        lines += render_gauges("micro_batch_mean_size", "Mean rows per micro-batch", {"predict": batching["batch_size"]["mean"]}, "endpoint")
+    return Response(content="\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/db-pool")
+async def debug_db_pool():
+    """Debug endpoint to view connection pool saturation and checkout waits"""
+    return pool_stats()
+
+@app.get("/debug/websockets")
+async def debug_websockets():
+    """Debug endpoint to view WebSocket connections, queue depth and dropped messages"""
+    return hub.stats()
+
 @app.get("/debug/users")
 async def debug_users(db: Session = Depends(get_db)):
     """Debug endpoint to view all users"""
-    users = db.query(models.User).all()
+    users = await db_executor.run(db.query(models.User).all)
     return [
         {
             "id": u.id,
@@ -681,21 +1005,76 @@ async def debug_users(db: Session = Depends(get_db)):
 
 # Add this after your existing imports
 
+# Rendered reports keyed by payload hash; 0 disables the cache
+PDF_CACHE_SIZE = int(os.getenv("PDF_CACHE_SIZE", "0"))
+report_cache = ReportCache(PDF_CACHE_SIZE)
+
 @app.post("/generate-pdf")
 async def generate_pdf(prediction_data: dict):
     try:
-        # Generate the PDF
-        pdf_path = PDFGenerator.generate_credit_report(prediction_data)
-        
-        # Return the PDF file
-        return FileResponse(
-            pdf_path,
-            media_type="application/pdf",
-            filename=os.path.basename(pdf_path)
-        )
+        # Payloads without a timestamp render the current time, so they get no key and bypass the cache
+        key = report_key(prediction_data)
+        content = report_cache.get(key) if key is not None and PDF_CACHE_SIZE > 0 else None
+        if content is None:
+            # Render in memory on a worker thread; nothing is written to disk
+            content = await report_executor.run(PDFGenerator.render_credit_report, prediction_data)
+            if key is not None:
+                report_cache.put(key, content)
+
+        filename = PDFGenerator.report_filename(prediction_data)
+        headers = {"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"}
+        if key is not None:
+            headers["ETag"] = f'"{key}"'
+        return Response(content=content, media_type="application/pdf", headers=headers)
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         logger.error(f"PDF generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate PDF")
+
+@app.post("/reports/export")
+async def export_reports(
+    export_request: ReportExportRequest,
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Reports for many of the user's predictions, selected by ID or by filter.
+    ZIP archives are streamed as reports render; a combined PDF is built whole and capped.
+    """
+    filters = export_request.dict(exclude={"format"})
+    for bound in ("since", "until"):
+        # Timestamps are stored as naive UTC
+        if filters[bound] is not None and filters[bound].tzinfo is not None:
+            filters[bound] = filters[bound].astimezone(timezone.utc).replace(tzinfo=None)
+    max_reports = EXPORT_PDF_MAX_REPORTS if export_request.format == "pdf" else EXPORT_MAX_REPORTS
+    if export_request.prediction_ids and len(export_request.prediction_ids) > max_reports:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {max_reports} reports per {export_request.format} export"
+        )
+
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    logger.info(f"Exporting {export_request.format} reports for user {current_user.id}")
+
+    if export_request.format == "pdf":
+        content = await report_exporter.render_combined(current_user.id, filters, max_reports)
+        return Response(
+            content=content,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'attachment; filename="credit_reports_{stamp}.pdf"'}
+        )
+
+    return StreamingResponse(
+        report_exporter.stream_zip(current_user.id, filters, max_reports),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="credit_reports_{stamp}.zip"'}
+    )
+
+@app.get("/debug/reports")
+async def debug_reports():
+    """Debug endpoint to view the report cache and bulk exports"""
+    return {"cache": report_cache.stats(), "export": report_exporter.stats()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
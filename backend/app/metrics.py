@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .batching import Histogram
+
+# Prometheus text exposition without the prometheus_client dependency
+
+# Seconds; spans a cache hit (~10us) to a slow commit (1s)
+STAGE_BUCKETS_SECONDS = [0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+METRIC_PREFIX = "credit_"
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{str(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+class _StageTimer:
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe_stage(self._stage, time.perf_counter() - self._start)
+        return False
+
+
+class Metrics:
+    """
+    Per-stage latency histograms and labelled counters for one worker process.
+
+    Stages are observed from the event loop and from executor threads, so
+    updates go through one lock; each update is a bisect and two additions.
+    """
+
+    def __init__(self, buckets: Iterable[float] = STAGE_BUCKETS_SECONDS):
+        self.buckets = list(buckets)
+        self._stages: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+
+    def timed(self, stage: str) -> _StageTimer:
+        """Context manager recording the wall time of its block under ``stage``"""
+        return _StageTimer(self, stage)
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {stage: histogram.snapshot() for stage, histogram in self._stages.items()},
+                "counters": {
+                    name + _labels(dict(labels)): value for (name, labels), value in self._counters.items()
+                }
+            }
+
+    def render(self) -> List[str]:
+        """Stage histograms and counters as Prometheus text exposition lines"""
+        name = f"{METRIC_PREFIX}stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Wall time of each request pipeline stage",
+            f"# TYPE {name} histogram"
+        ]
+        with self._lock:
+            for stage in sorted(self._stages):
+                histogram = self._stages[stage]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            counter_names = sorted({counter for counter, _ in self._counters})
+            for counter in counter_names:
+                full_name = f"{METRIC_PREFIX}{counter}_total"
+                lines.append(f"# TYPE {full_name} counter")
+                for (sample, labels), value in sorted(self._counters.items()):
+                    if sample == counter:
+                        lines.append(f"{full_name}{_labels(dict(labels))} {value}")
+        return lines
+
+
+def render_gauges(name: str, help_text: str, samples: Dict[str, Optional[float]], label: str, kind: str = "gauge") -> List[str]:
+    """Exposition lines for values already tracked elsewhere (executor, cache and queue stats)"""
+    full_name = f"{METRIC_PREFIX}{name}"
+    lines = [f"# HELP {full_name} {help_text}", f"# TYPE {full_name} {kind}"]
+    for label_value, value in samples.items():
+        if value is not None:
+            lines.append(f"{full_name}{_labels({label: label_value})} {value}")
+    return lines
+
+
+metrics = Metrics()
@@ -0,0 +1,54 @@
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Ordered schema changes for databases created before the matching model change.
+# Each entry is (version, statements); "{concurrently}" expands to CONCURRENTLY on
+# PostgreSQL so large tables are not locked while the index builds.
+MIGRATIONS = [
+    (
+        "0001_predictions_user_id_timestamp_index",
+        [
+            "CREATE INDEX {concurrently} IF NOT EXISTS ix_predictions_user_id_timestamp "
+            "ON predictions (user_id, timestamp DESC, id DESC)"
+        ],
+    ),
+]
+
+def _applied_versions(engine: Engine) -> set:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+        ))
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def run_migrations(engine: Engine):
+    """Apply every migration not yet recorded in schema_migrations"""
+    applied = _applied_versions(engine)
+    concurrently = "CONCURRENTLY" if engine.dialect.name == "postgresql" else ""
+    
+    for version, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        
+        logger.info(f"Applying migration {version}")
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for statement in statements:
+                conn.execute(text(statement.format(concurrently=concurrently)))
+        
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+                    {"version": version, "applied_at": datetime.utcnow()}
+                )
+        except IntegrityError:
+            # Another worker applied and recorded it concurrently; statements are idempotent
+            logger.info(f"Migration {version} already recorded by another process")
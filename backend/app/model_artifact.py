@@ -0,0 +1,305 @@
+"""
+Versioned, memory-mappable model artifact.
+
+An artifact is a directory holding ``manifest.json`` plus one ``.npy`` file
+per array: the linear coefficients, the fitted scaler and one-hot tables,
+the label encoder classes and a set of probe rows with their expected
+probabilities. Arrays are opened with ``mmap_mode='r'``, so loading costs a
+few page faults instead of unpickling sklearn objects, and every worker
+process on a host shares the same page-cache copy.
+
+Export an artifact from the training pickle (needs scikit-learn), from backend/:
+
+    python -m app.model_artifact export app/credit_scoring_model.pkl app/model_v1 --version 1.0
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .inference import CategoryEncoder, CompiledScorer, build_scorer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "credit_scoring_model.pkl")
+MODEL_VERIFY_CHECKSUM = os.getenv("MODEL_VERIFY_CHECKSUM", "true").lower() in ['yes', 'true', '1']
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is malformed, corrupt or incompatible"""
+
+
+class LoadedModel:
+    """Everything the scoring code needs from a model, whichever format it came from"""
+
+    def __init__(
+        self,
+        version: str,
+        checksum: str,
+        source: str,
+        artifact_format: str,
+        num_cols: List[str],
+        cat_cols: List[str],
+        encoder: CategoryEncoder,
+        scorer: Optional[CompiledScorer],
+        model=None,
+        label_encoders: Optional[dict] = None
+    ):
+        self.version = version
+        self.checksum = checksum
+        self.source = source
+        self.artifact_format = artifact_format
+        self.num_cols = num_cols
+        self.cat_cols = cat_cols
+        self.encoder = encoder
+        self.scorer = scorer
+        self.model = model
+        self.label_encoders = label_encoders
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "checksum": self.checksum,
+            "source": self.source,
+            "format": self.artifact_format,
+            "scorer_mode": self.scorer.mode if self.scorer is not None else "pandas"
+        }
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _combined_checksum(files: Dict[str, str]) -> str:
+    lines = "\n".join(f"{name}:{files[name]}" for name in sorted(files))
+    return hashlib.sha256(lines.encode()).hexdigest()
+
+
+def _numeric(array: np.ndarray, what: str) -> np.ndarray:
+    """Arrays must not need pickle, otherwise they cannot be memory-mapped"""
+    array = np.asarray(array)
+    if array.dtype == object:
+        array = np.asarray(array.tolist())
+    if array.dtype == object:
+        raise ArtifactError(f"{what} has object dtype and cannot be stored as a plain array")
+    return array
+
+
+# Export
+def export_artifact(model_data: dict, out_dir: str, feature_mapping: Dict[str, str], version: str) -> dict:
+    """Write ``model_data`` (the training pickle contents) as an array artifact and return its manifest"""
+    encoder = CategoryEncoder(model_data['label_encoders'], model_data['cat_cols'])
+    scorer = CompiledScorer(model_data, feature_mapping, encoder)
+    if scorer.mode != "linear":
+        raise ArtifactError(
+            f"Only models that compile to linear mode can be exported, this one compiles to '{scorer.mode}'"
+        )
+
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+
+    def _save(name: str, array: np.ndarray) -> str:
+        filename = f"{name}.npy"
+        path = os.path.join(out_dir, filename)
+        np.save(path, array, allow_pickle=False)
+        files[filename] = _file_sha256(path)
+        return filename
+
+    blocks = []
+    for i, (kind, positions, offset, params) in enumerate(scorer._blocks):
+        block = {"kind": kind, "positions": _save(f"block{i}_positions", positions)}
+        if kind == "scale":
+            mean, scale = params
+            block["offset"] = offset
+            block["mean"] = _save(f"block{i}_mean", mean) if mean is not None else None
+            block["scale"] = _save(f"block{i}_scale", scale) if scale is not None else None
+        else:
+            lookups, handle_unknown = params
+            block["handle_unknown"] = handle_unknown
+            block["lookups"] = [
+                {
+                    "offset": start,
+                    "categories": _save(f"block{i}_categories{j}", _numeric(categories, f"block {i} categories"))
+                }
+                for j, (start, categories) in enumerate(lookups)
+            ]
+        blocks.append(block)
+
+    probes = scorer._probe_vectors()
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "num_cols": list(scorer.num_cols),
+        "cat_cols": list(scorer.cat_cols),
+        "feature_names": scorer.feature_names,
+        "classes": {
+            col: _save(f"classes_{col}", np.asarray([str(c) for c in model_data['label_encoders'][col].classes_]))
+            for col in scorer.cat_cols
+        },
+        "coef": _save("coef", np.ascontiguousarray(scorer._coef_t.reshape(-1))),
+        "intercept": _save("intercept", np.asarray(scorer._intercept)),
+        "sparse": scorer._sparse,
+        "blocks": blocks,
+        "probe_vectors": _save("probe_vectors", probes),
+        "probe_expected": _save("probe_expected", scorer.predict_proba(probes)),
+    }
+    manifest["files"] = files
+    manifest["checksum"] = _combined_checksum(files)
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Exported model {version} to {out_dir} ({len(files)} arrays, checksum {manifest['checksum'][:12]})")
+    return manifest
+
+
+# Loading
+def _load_arrays(path: str, feature_mapping: Dict[str, str], fallback: Optional[str]) -> LoadedModel:
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"Unsupported artifact format {manifest.get('format')!r}")
+
+    files = manifest["files"]
+    if _combined_checksum(files) != manifest["checksum"]:
+        raise ArtifactError("Manifest checksum does not match its file list")
+    if MODEL_VERIFY_CHECKSUM:
+        for filename, expected in files.items():
+            if _file_sha256(os.path.join(path, filename)) != expected:
+                raise ArtifactError(f"Checksum mismatch for {filename}")
+
+    def _array(filename: Optional[str]) -> Optional[np.ndarray]:
+        if filename is None:
+            return None
+        if filename not in files:
+            raise ArtifactError(f"{filename} is not listed in the manifest")
+        return np.load(os.path.join(path, filename), mmap_mode="r", allow_pickle=False)
+
+    cat_cols = manifest["cat_cols"]
+    encoder = CategoryEncoder({col: _array(manifest["classes"][col]) for col in cat_cols}, cat_cols, fallback=fallback)
+
+    blocks = []
+    for block in manifest["blocks"]:
+        positions = np.asarray(_array(block["positions"]))
+        if block["kind"] == "scale":
+            params = (_array(block["mean"]), _array(block["scale"]))
+            blocks.append(("scale", positions, block["offset"], params))
+        else:
+            lookups = [(lookup["offset"], _array(lookup["categories"])) for lookup in block["lookups"]]
+            blocks.append(("onehot", positions, None, (lookups, block["handle_unknown"])))
+
+    scorer = CompiledScorer.from_arrays(
+        feature_mapping,
+        manifest["num_cols"],
+        cat_cols,
+        encoder,
+        blocks,
+        _array(manifest["coef"]),
+        _array(manifest["intercept"]),
+        sparse=manifest["sparse"]
+    )
+    if scorer.feature_names != manifest["feature_names"]:
+        raise ArtifactError("Artifact feature layout does not match FEATURE_MAPPING")
+
+    # Same probe rows the exporter scored with the sklearn model
+    probes = _array(manifest["probe_vectors"])
+    if not np.array_equal(scorer.predict_proba(np.array(probes)), _array(manifest["probe_expected"])):
+        raise ArtifactError("Artifact does not reproduce its probe probabilities")
+
+    return LoadedModel(
+        version=manifest["version"],
+        checksum=manifest["checksum"],
+        source=path,
+        artifact_format="arrays",
+        num_cols=manifest["num_cols"],
+        cat_cols=cat_cols,
+        encoder=encoder,
+        scorer=scorer
+    )
+
+
+def _load_pickle(path: str, feature_mapping: Dict[str, str], fallback: Optional[str], compile_scorer: bool) -> LoadedModel:
+    import joblib
+
+    model_data = joblib.load(path)
+    encoder = CategoryEncoder(model_data['label_encoders'], model_data['cat_cols'], fallback=fallback)
+    return LoadedModel(
+        version=str(model_data.get('version', "1.0")),
+        checksum=_file_sha256(path),
+        source=path,
+        artifact_format="pickle",
+        num_cols=model_data['num_cols'],
+        cat_cols=model_data['cat_cols'],
+        encoder=encoder,
+        scorer=build_scorer(model_data, feature_mapping, encoder) if compile_scorer else None,
+        model=model_data['model'],
+        label_encoders=model_data['label_encoders']
+    )
+
+
+def artifact_checksum(path: str) -> Optional[str]:
+    """Checksum load_model would report for ``path``, without loading it"""
+    if os.path.basename(path) == MANIFEST_NAME:
+        path = os.path.dirname(path)
+    if os.path.isdir(path):
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            return json.load(f).get("checksum")
+    if os.path.exists(path):
+        return _file_sha256(path)
+    return None
+
+
+def load_model(
+    path: str,
+    feature_mapping: Dict[str, str],
+    fallback: Optional[str] = None,
+    compile_scorer: bool = True
+) -> LoadedModel:
+    """
+    Load an array artifact directory (or its manifest.json) or a joblib pickle.
+    Array artifacts always score through the compiled linear path.
+    """
+    if os.path.basename(path) == MANIFEST_NAME:
+        path = os.path.dirname(path)
+    if os.path.isdir(path):
+        return _load_arrays(path, feature_mapping, fallback)
+    return _load_pickle(path, feature_mapping, fallback, compile_scorer)
+
+
+def main(argv=None):
+    from .scoring import FEATURE_MAPPING
+
+    parser = argparse.ArgumentParser(description="Model artifact tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Convert a joblib pickle into an array artifact")
+    export.add_argument("source", help="Path to the joblib pickle")
+    export.add_argument("destination", help="Artifact directory to create")
+    export.add_argument("--version", required=True, help="Version recorded in the manifest")
+    verify = commands.add_parser("verify", help="Load an artifact and check its checksums and probe rows")
+    verify.add_argument("path", help="Artifact directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "export":
+        import joblib
+
+        export_artifact(joblib.load(args.source), args.destination, FEATURE_MAPPING, args.version)
+    else:
+        loaded = load_model(args.path, FEATURE_MAPPING)
+        logger.info(f"Artifact OK: {loaded.info()}")
+
+
+if __name__ == "__main__":
+    main()
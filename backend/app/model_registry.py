@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .model_artifact import LoadedModel, artifact_checksum, load_model
+from .scoring import predict_default_proba
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MODEL_VALIDATION_SAMPLE_SIZE = int(os.getenv("MODEL_VALIDATION_SAMPLE_SIZE", "256"))
+# Largest mean absolute change in probability of default accepted on reload; 0 disables the check
+MODEL_MAX_DRIFT = float(os.getenv("MODEL_MAX_DRIFT", "0"))
+MODEL_WARMUP_ROUNDS = int(os.getenv("MODEL_WARMUP_ROUNDS", "3"))
+
+# Plausible ranges for the numeric form fields of the validation sample
+SAMPLE_NUMERIC_RANGES = {
+    "age": (19, 80),
+    "income": (1000, 250000),
+    "loanAmount": (500, 500000),
+    "interestRate": (1, 30),
+    "turnover": (1000, 1000000),
+    "customerTenure": (0, 240),
+    "avgDaysLateCurrent": (0, 90),
+    "numLatePaymentsCurrent": (0, 12),
+    "unpaidAmount": (0, 50000),
+}
+
+
+class ModelValidationError(Exception):
+    """Raised when a candidate model fails warmup or validation and is not activated"""
+
+
+def sample_applications(
+    loaded: LoadedModel,
+    feature_mapping: Dict[str, str],
+    size: int,
+    seed: int = 0
+) -> List[dict]:
+    """Deterministic form payloads covering the model's category vocabulary; ``seed`` varies the rows"""
+    rng = np.random.default_rng(seed)
+    records = [{} for _ in range(size)]
+    for form_field, model_feature in feature_mapping.items():
+        if model_feature == 'has_guarantee':
+            values = ["Yes", "No"] * (size // 2 + 1)
+        elif model_feature in loaded.cat_cols:
+            vocabulary = list(loaded.encoder.tables[model_feature])
+            values = [vocabulary[(i + seed) % len(vocabulary)] for i in range(size)]
+        else:
+            low, high = SAMPLE_NUMERIC_RANGES.get(form_field, (0, 1000))
+            values = rng.uniform(low, high, size).round(2).tolist()
+        for record, value in zip(records, values):
+            record[form_field] = value
+    return records
+
+
+class ModelRegistry:
+    """
+    Holds the active model and the one it replaced.
+
+    Request handlers read ``active`` once and use that object for the whole
+    request, so a swap never mixes two models inside one prediction. A reload
+    loads the candidate off the event loop, warms it up, scores a sample
+    batch and only then replaces ``active`` in a single assignment; the old
+    model stays in ``previous`` for ``rollback``.
+
+    Each worker process has its own registry. ``poll`` reloads when the
+    artifact at the configured path changes, which is how every worker picks
+    up a new model without a restart.
+    """
+
+    def __init__(
+        self,
+        feature_mapping: Dict[str, str],
+        fallback: Optional[str] = None,
+        compile_scorer: bool = True,
+        sample_size: int = MODEL_VALIDATION_SAMPLE_SIZE,
+        max_drift: float = MODEL_MAX_DRIFT
+    ):
+        self.feature_mapping = feature_mapping
+        self.fallback = fallback
+        self.compile_scorer = compile_scorer
+        self.sample_size = sample_size
+        self.max_drift = max_drift
+        self.active: Optional[LoadedModel] = None
+        self.previous: Optional[LoadedModel] = None
+        self._reload_lock = asyncio.Lock()
+        self._swap_lock = threading.Lock()
+        self.events = deque(maxlen=20)
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.rollbacks = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.active.version if self.active is not None else None
+
+    def load_initial(self, path: str) -> LoadedModel:
+        """Load, warm up and activate the startup model synchronously"""
+        self._activate(self.prepare(path), action="load")
+        return self.active
+
+    def prepare(self, path: str, reference: Optional[LoadedModel] = None) -> LoadedModel:
+        """Load a candidate, warm it up and validate it; blocking, run it off the event loop"""
+        candidate = load_model(path, self.feature_mapping, fallback=self.fallback, compile_scorer=self.compile_scorer)
+        records = sample_applications(candidate, self.feature_mapping, self.sample_size)
+        self._warm_up(candidate, records)
+        self._validate(candidate, records, reference)
+        return candidate
+
+    def _warm_up(self, candidate: LoadedModel, records: List[dict]):
+        # First calls pay for page faults on mapped arrays, BLAS init and lazy imports
+        for _ in range(MODEL_WARMUP_ROUNDS):
+            if candidate.scorer is not None:
+                for record in records[:8]:
+                    candidate.scorer.predict_one(candidate.scorer.vectorize(record))
+            predict_default_proba(candidate, pd.DataFrame.from_records(records))
+
+    def _validate(self, candidate: LoadedModel, records: List[dict], reference: Optional[LoadedModel]):
+        frame = pd.DataFrame.from_records(records)
+        try:
+            probabilities = np.asarray(predict_default_proba(candidate, frame), dtype=np.float64)
+        except Exception as e:
+            raise ModelValidationError(f"Model {candidate.version} failed on the sample batch: {str(e)}") from e
+
+        if probabilities.shape != (len(records),):
+            raise ModelValidationError(f"Model {candidate.version} returned {probabilities.shape} for {len(records)} rows")
+        if not np.all(np.isfinite(probabilities)) or probabilities.min() < 0 or probabilities.max() > 1:
+            raise ModelValidationError(f"Model {candidate.version} produced probabilities outside [0, 1]")
+
+        if reference is not None and self.max_drift > 0:
+            drift = float(np.mean(np.abs(probabilities - predict_default_proba(reference, frame))))
+            if drift > self.max_drift:
+                raise ModelValidationError(
+                    f"Model {candidate.version} moved the sample by {drift:.4f} on average (limit {self.max_drift})"
+                )
+
+    def _activate(self, candidate: LoadedModel, action: str):
+        with self._swap_lock:
+            self.previous, self.active = self.active, candidate
+        self.events.append({
+            "action": action,
+            "version": candidate.version,
+            "checksum": candidate.checksum,
+            "at": datetime.utcnow().isoformat()
+        })
+        logger.info(f"Model {candidate.version} active ({action}, checksum {candidate.checksum[:12]})")
+
+    async def reload(self, path: str) -> LoadedModel:
+        """Load ``path`` in the background and swap it in if it passes validation"""
+        async with self._reload_lock:
+            try:
+                candidate = await asyncio.to_thread(self.prepare, path, self.active)
+            except Exception as e:
+                self.failed_reloads += 1
+                logger.error(f"Model reload from {path} rejected: {str(e)}")
+                raise
+            self._activate(candidate, action="reload")
+            self.reloads += 1
+            return candidate
+
+    def rollback(self) -> LoadedModel:
+        """Reactivate the previous model"""
+        with self._swap_lock:
+            if self.previous is None:
+                raise ValueError("No previous model to roll back to")
+            restored = self.previous
+        self._activate(restored, action="rollback")
+        self.rollbacks += 1
+        return restored
+
+    async def poll(self, path: str, interval: float):
+        """Reload whenever the artifact at ``path`` changes; a rejected or rolled-back file is not retried"""
+        last_seen = self.active.checksum if self.active is not None else None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                checksum = await asyncio.to_thread(artifact_checksum, path)
+                if checksum is None or checksum == last_seen:
+                    continue
+                last_seen = checksum
+                logger.info(f"Model artifact at {path} changed, reloading")
+                await self.reload(path)
+            except Exception as e:
+                logger.error(f"Model poll failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active.info() if self.active is not None else None,
+            "previous": self.previous.info() if self.previous is not None else None,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "rollbacks": self.rollbacks,
+            "events": list(self.events)
+        }
+
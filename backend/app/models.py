@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -35,4 +35,9 @@ class Prediction(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     # Relationship to user
-    user = relationship("User", back_populates="predictions")
\ No newline at end of file
+    user = relationship("User", back_populates="predictions")
+    
+    # History queries filter on user_id and page by (timestamp, id) newest first
+    __table_args__ = (
+        Index("ix_predictions_user_id_timestamp", user_id, timestamp.desc(), id.desc()),
+    )
\ No newline at end of file
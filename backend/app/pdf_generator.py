@@ -1,60 +1,147 @@
 from fpdf import FPDF
 from datetime import datetime
-import os
+from collections import OrderedDict
+from typing import List, Optional
+import hashlib
+import json
+import threading
+
+def _payload_timestamp(data: dict) -> Optional[datetime]:
+    timestamp = data.get('timestamp')
+    if timestamp:
+        try:
+            return datetime.fromisoformat(str(timestamp))
+        except ValueError:
+            pass
+    return None
+
+def _analysis_date(data: dict) -> str:
+    # Prefer the prediction's own timestamp so the same payload always renders the same report
+    timestamp = _payload_timestamp(data) or datetime.now()
+    return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+def _pdf_bytes(pdf: FPDF) -> bytes:
+    """PDF document as bytes; PyFPDF returns a latin-1 str, fpdf2 a bytearray"""
+    output = pdf.output(dest='S')
+    if isinstance(output, str):
+        return output.encode('latin-1')
+    return bytes(output)
+
+def report_key(data: dict) -> Optional[str]:
+    """
+    Content address of a report: sha256 of the canonical JSON payload. None
+    when the payload has no usable timestamp, since the report then shows the
+    render time and must not be cached.
+    """
+    if _payload_timestamp(data) is None:
+        return None
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ReportCache:
+    """Bounded LRU of rendered reports keyed by report_key"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def put(self, key: str, content: bytes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(len(content) for content in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses
+            }
 
 class PDFGenerator:
     @staticmethod
-    def generate_credit_report(data: dict, filename: str = None):
-        pdf = FPDF()
+    def _write_report(pdf: FPDF, data: dict):
+        """Append one client's report to ``pdf`` as a new page"""
         pdf.add_page()
-        
+
         # Set font for the title
         pdf.set_font("Arial", 'B', 16)
         pdf.cell(200, 10, txt="Credit Risk Analysis Report", ln=1, align='C')
-        
+
         # Client information section
         pdf.set_font("Arial", 'B', 12)
         pdf.cell(200, 10, txt="Client Information", ln=1)
         pdf.set_font("Arial", '', 10)
         pdf.cell(200, 6, txt=f"Client Name: {data.get('client_name', 'N/A')}", ln=1)
-        pdf.cell(200, 6, txt=f"Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=1)
-        
+        pdf.cell(200, 6, txt=f"Analysis Date: {_analysis_date(data)}", ln=1)
+
         # Results section
         pdf.set_font("Arial", 'B', 12)
         pdf.cell(200, 10, txt="Credit Analysis Results", ln=1)
         pdf.set_font("Arial", '', 10)
-        
+
         # Score and risk
         pdf.cell(200, 6, txt=f"Credit Score: {data.get('creditScore', 'N/A')}", ln=1)
         pdf.cell(200, 6, txt=f"Risk Level: {data.get('riskLevel', 'N/A').title()}", ln=1)
         pdf.cell(200, 6, txt=f"Approval Probability: {data.get('approvalProbability', 'N/A')}", ln=1)
         pdf.cell(200, 6, txt=f"Decision: {data.get('decision', 'N/A').title()}", ln=1)
-        
+
         # Key factors
         pdf.set_font("Arial", 'B', 12)
         pdf.cell(200, 10, txt="Key Factors", ln=1)
         pdf.set_font("Arial", '', 10)
-        
+
         if 'keyFactors' in data:
             factors = data['keyFactors']
             if factors.get('positive'):
                 pdf.cell(200, 6, txt="Positive Factors:", ln=1)
                 for factor in factors['positive']:
                     pdf.cell(200, 6, txt=f"- {factor}", ln=1)
-            
+
             if factors.get('negative'):
                 pdf.cell(200, 6, txt="Negative Factors:", ln=1)
                 for factor in factors['negative']:
                     pdf.cell(200, 6, txt=f"- {factor}", ln=1)
-        
-        # Generate file path
-        if not filename:
-            filename = f"credit_report_{data.get('client_name', 'client')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        
-        # Ensure reports directory exists
-        os.makedirs("reports", exist_ok=True)
-        filepath = os.path.join("reports", filename)
-        
-        # Output the PDF
-        pdf.output(filepath)
-        return filepath
\ No newline at end of file
+
+    @staticmethod
+    def report_filename(data: dict) -> str:
+        return f"credit_report_{data.get('client_name', 'client')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+
+    @staticmethod
+    def render_credit_report(data: dict) -> bytes:
+        """Render a report in memory and return the PDF bytes"""
+        pdf = FPDF()
+        PDFGenerator._write_report(pdf, data)
+        return _pdf_bytes(pdf)
+
+    @staticmethod
+    def render_many(payloads: List[dict]) -> List[bytes]:
+        """One PDF per payload; run in a process pool for bulk exports"""
+        return [PDFGenerator.render_credit_report(data) for data in payloads]
+
+    @staticmethod
+    def render_combined(payloads: List[dict]) -> bytes:
+        """All payloads as consecutive pages of a single PDF"""
+        pdf = FPDF()
+        for data in payloads:
+            PDFGenerator._write_report(pdf, data)
+        return _pdf_bytes(pdf)
@@ -0,0 +1,112 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Same keys as crud.get_prediction_stats
+STAT_FIELDS = [
+    "total",
+    "score_sum",
+    "high_risk",
+    "medium_risk",
+    "score_high_risk",
+    "score_medium_risk",
+    "score_low_risk",
+    "approved",
+    "approved_with_conditions",
+    "declined",
+]
+
+
+def _empty() -> Dict[str, int]:
+    return {field: 0 for field in STAT_FIELDS}
+
+
+def _contributions(credit_score: int, risk_level: str, decision: str):
+    """Fields a single prediction adds to, mirroring the CASE expressions in crud"""
+    risk_level = risk_level.lower()
+    decision = decision.lower()
+
+    yield "total", 1
+    yield "score_sum", credit_score
+    if risk_level in ("high", "very high"):
+        yield "high_risk", 1
+    elif risk_level == "medium":
+        yield "medium_risk", 1
+    if 300 <= credit_score <= 579:
+        yield "score_high_risk", 1
+    elif 580 <= credit_score <= 667:
+        yield "score_medium_risk", 1
+    elif 668 <= credit_score <= 850:
+        yield "score_low_risk", 1
+    if decision == "approved":
+        yield "approved", 1
+    elif decision == "approved with conditions":
+        yield "approved_with_conditions", 1
+    elif decision == "declined":
+        yield "declined", 1
+
+
+class PortfolioStats:
+    """
+    Prediction aggregates kept in memory, overall and per user.
+
+    Seeded from the database at startup and updated in O(1) whenever a
+    prediction is created or deleted. Other worker processes write to the
+    same table without updating this copy, so ``reconcile`` periodically
+    replaces it with fresh database totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = _empty()
+        self._by_user: Dict[Optional[int], Dict[str, int]] = {}
+        self.seeded = False
+
+    def record(self, credit_score: int, risk_level: str, decision: str, user_id: Optional[int], sign: int = 1):
+        with self._lock:
+            user_stats = self._by_user.setdefault(user_id, _empty())
+            for field, amount in _contributions(credit_score, risk_level, decision):
+                self._totals[field] += sign * amount
+                user_stats[field] += sign * amount
+
+    def remove(self, credit_score: int, risk_level: str, decision: str, user_id: Optional[int]):
+        self.record(credit_score, risk_level, decision, user_id, sign=-1)
+
+    def load(self, rows: Iterable[dict]):
+        """Replace all aggregates with per-user rows from crud.get_prediction_stats_by_user"""
+        totals = _empty()
+        by_user = {}
+        for row in rows:
+            user_stats = {field: int(row[field]) for field in STAT_FIELDS}
+            by_user[row["user_id"]] = user_stats
+            for field in STAT_FIELDS:
+                totals[field] += user_stats[field]
+
+        with self._lock:
+            drift = self._totals["total"] - totals["total"]
+            self._totals = totals
+            self._by_user = by_user
+            was_seeded, self.seeded = self.seeded, True
+
+        if was_seeded and drift:
+            logger.info(f"Portfolio stats reconciled, corrected drift of {-drift} predictions")
+
+    def snapshot(self, user_id: Optional[int] = None, per_user: bool = False) -> Dict[str, int]:
+        """Copy of the overall aggregates, or of one user's when ``per_user`` is set"""
+        with self._lock:
+            if per_user:
+                return dict(self._by_user.get(user_id) or _empty())
+            return dict(self._totals)
+
+    def count(self, user_id: Optional[int] = None) -> int:
+        """Prediction count for a user, or for everyone when user_id is None"""
+        with self._lock:
+            if user_id is None:
+                return self._totals["total"]
+            return self._by_user.get(user_id, {}).get("total", 0)
+
+
+portfolio_stats = PortfolioStats()
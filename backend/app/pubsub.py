@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Callable, List, Optional
+
+from .broadcast import Topic
+from .database import DATABASE_URL
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# "memory" keeps events inside this process; "postgres" fans them out to every worker via LISTEN/NOTIFY
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory").lower()
+BROADCAST_CHANNEL = os.getenv("BROADCAST_CHANNEL", "credit_events")
+BROADCAST_BATCH_MS = float(os.getenv("BROADCAST_BATCH_MS", "20"))
+BROADCAST_MAX_PENDING = int(os.getenv("BROADCAST_MAX_PENDING", "10000"))
+BROADCAST_RECONNECT_SECONDS = float(os.getenv("BROADCAST_RECONNECT_SECONDS", "2"))
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7999
+
+Deliver = Callable[[dict, Optional[Topic]], None]
+
+
+class InProcessBackend:
+    """Delivers published events straight back to this process's hub"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    def publish(self, message: dict, topic: Optional[Topic] = None):
+        if self._deliver is not None:
+            self._deliver(message, topic)
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+def _encode_event(message: dict, topic: Optional[Topic]) -> str:
+    return json.dumps([message, list(topic) if topic is not None else None])
+
+
+def chunk_events(encoded: List[str], limit: int = NOTIFY_PAYLOAD_LIMIT) -> List[List[str]]:
+    """Group encoded events into JSON arrays that each fit in one NOTIFY payload"""
+    chunks, current, size = [], [], 2
+    for event in encoded:
+        event_size = len(event.encode("utf-8")) + 1
+        if current and size + event_size > limit:
+            chunks.append(current)
+            current, size = [], 2
+        current.append(event)
+        size += event_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class PostgresNotifyBackend:
+    """
+    Cross-worker fan-out over Postgres LISTEN/NOTIFY on the existing database.
+
+    ``publish`` only buffers the event. A flusher task waits ``batch_ms``
+    after the first buffered event, then sends everything collected as JSON
+    arrays chunked under the NOTIFY payload limit. Every worker, including
+    the publisher, LISTENs on the channel and hands each received event to
+    its own hub. If the connection is down, events are delivered locally so
+    this worker's dashboards still update.
+    """
+
+    name = "postgres"
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = BROADCAST_CHANNEL,
+        batch_ms: float = BROADCAST_BATCH_MS,
+        max_pending: int = BROADCAST_MAX_PENDING
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.batch = batch_ms / 1000.0
+        self.max_pending = max_pending
+        self._deliver: Optional[Deliver] = None
+        self._connection = None
+        self._pending = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.notifies_sent = 0
+        self.events_sent = 0
+        self.events_received = 0
+        self.events_dropped = 0
+        self.local_fallbacks = 0
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        await self._connect()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        self._stopping = True
+        for task in (self._flusher, self._reconnect):
+            if task is not None:
+                task.cancel()
+        if self._pending:
+            await self._flush()
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    async def _connect(self):
+        import asyncpg
+
+        try:
+            connection = await asyncpg.connect(self.dsn)
+            await connection.add_listener(self.channel, self._on_notify)
+            connection.add_termination_listener(self._on_terminated)
+            self._connection = connection
+            logger.info(f"Listening for broadcast events on channel '{self.channel}'")
+        except Exception as e:
+            logger.error(f"Broadcast LISTEN connection failed: {str(e)}")
+            self._connection = None
+            self._schedule_reconnect()
+
+    def _on_terminated(self, connection):
+        if self._connection is connection:
+            logger.warning("Broadcast LISTEN connection lost")
+            self._connection = None
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._stopping or (self._reconnect is not None and not self._reconnect.done()):
+            return
+        self._reconnect = asyncio.create_task(self._reconnect_later())
+
+    async def _reconnect_later(self):
+        await asyncio.sleep(BROADCAST_RECONNECT_SECONDS)
+        self._reconnect = None
+        await self._connect()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        if self._deliver is None:
+            return
+        try:
+            events = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed broadcast payload on '{channel}'")
+            return
+        for message, topic in events:
+            self.events_received += 1
+            self._deliver(message, Topic(*topic) if topic is not None else None)
+
+    def publish(self, message: dict, topic: Optional[Topic] = None):
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.events_dropped += 1
+        self._pending.append((message, topic))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch)
+            self._wakeup.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Broadcast flush failed: {str(e)}")
+
+    async def _flush(self):
+        events, self._pending = list(self._pending), deque()
+        if not events:
+            return
+
+        if self._connection is None:
+            self._deliver_locally(events)
+            return
+
+        encoded, kept = [], []
+        for message, topic in events:
+            event = _encode_event(message, topic)
+            if len(event.encode("utf-8")) + 2 > NOTIFY_PAYLOAD_LIMIT:
+                # Too large for NOTIFY on its own; only this worker's clients get it
+                logger.warning("Broadcast event exceeds NOTIFY payload limit, delivering locally")
+                self._deliver_locally([(message, topic)])
+                continue
+            encoded.append(event)
+            kept.append((message, topic))
+
+        sent = 0
+        for chunk in chunk_events(encoded):
+            try:
+                await self._connection.execute(
+                    "SELECT pg_notify($1, $2)", self.channel, "[" + ",".join(chunk) + "]"
+                )
+            except Exception as e:
+                logger.error(f"Broadcast NOTIFY failed: {str(e)}")
+                self._deliver_locally(kept[sent:])
+                return
+            sent += len(chunk)
+            self.notifies_sent += 1
+            self.events_sent += len(chunk)
+
+    def _deliver_locally(self, events):
+        self.local_fallbacks += len(events)
+        for message, topic in events:
+            self._deliver(message, topic)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "channel": self.channel,
+            "connected": self._connection is not None,
+            "pending": len(self._pending),
+            "notifies_sent": self.notifies_sent,
+            "events_sent": self.events_sent,
+            "events_received": self.events_received,
+            "events_dropped": self.events_dropped,
+            "local_fallbacks": self.local_fallbacks
+        }
+
+
+def create_backend():
+    """Backend selected by BROADCAST_BACKEND; falls back to in-process when Postgres is unavailable"""
+    if BROADCAST_BACKEND == "postgres":
+        if not DATABASE_URL.startswith("postgresql"):
+            logger.warning("BROADCAST_BACKEND=postgres needs a Postgres DATABASE_URL, using in-process broadcasts")
+            return InProcessBackend()
+        # asyncpg takes a plain libpq URL without the SQLAlchemy driver suffix
+        scheme, rest = DATABASE_URL.split("://", 1)
+        return PostgresNotifyBackend(f"{scheme.split('+', 1)[0]}://{rest}")
+    if BROADCAST_BACKEND != "memory":
+        logger.warning(f"Unknown BROADCAST_BACKEND '{BROADCAST_BACKEND}', using in-process broadcasts")
+    return InProcessBackend()
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Optional, Tuple
+
+from . import async_crud, models
+from .database import AsyncSessionLocal
+from .pdf_generator import PDFGenerator
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EXPORT_PROCESSES = int(os.getenv("EXPORT_PROCESSES", str(os.cpu_count() or 1)))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "25"))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+EXPORT_MAX_REPORTS = int(os.getenv("EXPORT_MAX_REPORTS", "10000"))
+# FPDF builds a whole document in memory, so combined PDFs are capped separately
+EXPORT_PDF_MAX_REPORTS = int(os.getenv("EXPORT_PDF_MAX_REPORTS", "500"))
+
+
+def report_payload(prediction: models.Prediction) -> dict:
+    """Stored prediction in the shape PDFGenerator expects"""
+    return {
+        "client_name": prediction.client_name,
+        "creditScore": prediction.credit_score,
+        "riskLevel": prediction.risk_level,
+        "decision": prediction.decision,
+        "timestamp": prediction.timestamp.isoformat()
+    }
+
+
+def report_entry_name(prediction: models.Prediction) -> str:
+    client = re.sub(r"[^A-Za-z0-9_-]+", "_", prediction.client_name or "client").strip("_") or "client"
+    return f"credit_report_{prediction.id}_{client}.pdf"
+
+
+class _ZipSink:
+    """Write-only file object; zipfile falls back to streaming mode when it cannot seek"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ReportExporter:
+    """
+    Renders many stored predictions as PDF reports across a process pool.
+
+    Predictions are read in keyset pages with a short-lived session per page,
+    split into batches and rendered in worker processes. At most
+    ``max_in_flight`` batches are pending at once and results are yielded in
+    order, so memory stays bounded however many reports are exported.
+    """
+
+    def __init__(
+        self,
+        processes: int = EXPORT_PROCESSES,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        page_size: int = EXPORT_PAGE_SIZE
+    ):
+        self.processes = processes
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.max_in_flight = processes * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.exports_started = 0
+        self.reports_rendered = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers only import pdf_generator, not the app and its threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _batches(self, user_id: Optional[int], filters: dict, max_reports: int):
+        after = None
+        remaining = max_reports
+        while remaining > 0:
+            async with AsyncSessionLocal() as db:
+                page = await async_crud.get_report_export_page(
+                    db, user_id, after=after, limit=min(self.page_size, remaining), **filters
+                )
+            if not page:
+                return
+            remaining -= len(page)
+            after = (page[-1].timestamp, page[-1].id)
+
+            entries = [(report_entry_name(p), report_payload(p)) for p in page]
+            for start in range(0, len(entries), self.batch_size):
+                yield entries[start:start + self.batch_size]
+
+            if len(page) < self.page_size:
+                return
+
+    async def rendered(
+        self, user_id: Optional[int], filters: dict, max_reports: int = EXPORT_MAX_REPORTS
+    ) -> AsyncIterator[Tuple[str, bytes]]:
+        """Yield (entry name, PDF bytes) for every matching prediction, newest first"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        in_flight = deque()
+        self.exports_started += 1
+
+        try:
+            async for batch in self._batches(user_id, filters, max_reports):
+                names = [name for name, _ in batch]
+                future = loop.run_in_executor(pool, PDFGenerator.render_many, [payload for _, payload in batch])
+                in_flight.append((names, future))
+
+                while len(in_flight) >= self.max_in_flight:
+                    names, future = in_flight.popleft()
+                    for item in zip(names, await future):
+                        yield item
+                    self.reports_rendered += len(names)
+
+            while in_flight:
+                names, future = in_flight.popleft()
+                for item in zip(names, await future):
+                    yield item
+                self.reports_rendered += len(names)
+        finally:
+            # Client went away mid-export: don't render batches nobody will read
+            for _, future in in_flight:
+                future.cancel()
+
+    async def stream_zip(
+        self, user_id: Optional[int], filters: dict, max_reports: int = EXPORT_MAX_REPORTS
+    ) -> AsyncIterator[bytes]:
+        """ZIP archive of the reports, yielded entry by entry as they are rendered"""
+        sink = _ZipSink()
+        # Reports are already deflate-compressed PDFs; storing them avoids a second pass
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            async for name, content in self.rendered(user_id, filters, max_reports):
+                archive.writestr(name, content)
+                yield sink.drain()
+        yield sink.drain()
+
+    async def render_combined(
+        self, user_id: Optional[int], filters: dict, max_reports: int = EXPORT_PDF_MAX_REPORTS
+    ) -> bytes:
+        """All reports as pages of one PDF, rendered in a single worker process"""
+        payloads = []
+        async for batch in self._batches(user_id, filters, max_reports):
+            payloads.extend(payload for _, payload in batch)
+        self.exports_started += 1
+        content = await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), PDFGenerator.render_combined, payloads
+        )
+        self.reports_rendered += len(payloads)
+        return content
+
+    def stats(self) -> dict:
+        return {
+            "processes": self.processes,
+            "batch_size": self.batch_size,
+            "pool_started": self._pool is not None,
+            "exports_started": self.exports_started,
+            "reports_rendered": self.reports_rendered
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+report_exporter = ReportExporter()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from .scoring import calculate_credit_score, get_key_factors
+
+
+class ScoreResult(NamedTuple):
+    prob_default: float
+    credit_score: int
+    key_factors: dict
+
+
+def score_result(prob_default: float, feature_values: dict) -> ScoreResult:
+    """Everything /predict derives from the model output, ready to cache"""
+    return ScoreResult(float(prob_default), calculate_credit_score(prob_default), get_key_factors(feature_values))
+
+
+def result_key(loaded, feature_values: dict) -> str:
+    """
+    sha256 of the encoded model features, scoped to one model artifact.
+    Fields the model never sees (client name, employment, ...) are not part
+    of ``feature_values``, so resubmissions that only change those share a key.
+    """
+    canonical = json.dumps(
+        [[name, float(feature_values[name])] for name in sorted(feature_values)],
+        separators=(',', ':')
+    )
+    scope = f"{loaded.version}:{loaded.checksum}:"
+    return hashlib.sha256((scope + canonical).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded LRU of scoring results keyed by result_key.
+
+    Keys include the model checksum, so a reload never serves another model's
+    result; entries of a replaced model age out, and become live again after
+    a rollback.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[ScoreResult]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: ScoreResult) -> ScoreResult:
+        if self.max_entries <= 0:
+            return result
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
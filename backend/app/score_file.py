@@ -0,0 +1,190 @@
+"""
+Offline scoring of a CSV or Parquet file with the production preprocessing.
+
+Run from backend/:
+
+    python -m app.score_file credit_dataset_200000_rows.csv scored.csv --workers 4
+
+The input is read in chunks, each chunk is scored in a worker process and
+results are appended to the output in input order, so memory stays constant
+whatever the file size. Columns may use the API form names (``loanAmount``)
+or the model feature names (``loan_amount``).
+"""
+import argparse
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from .inference import UNSEEN_CATEGORY_FALLBACK
+from .model_artifact import DEFAULT_MODEL_PATH, LoadedModel
+from .model_artifact import load_model as load_model_artifact
+from .scoring import (
+    FEATURE_MAPPING,
+    calculate_credit_scores,
+    determine_decisions,
+    determine_risk_levels,
+    predict_default_proba,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Model of the current worker process, set by load_model
+_loaded_model: Optional[LoadedModel] = None
+
+
+def load_model(model_path: str):
+    """Load the model once per process"""
+    global _loaded_model
+    _loaded_model = load_model_artifact(model_path, FEATURE_MAPPING, fallback=UNSEEN_CATEGORY_FALLBACK)
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Input rows plus probability of default, credit score, risk level and decision"""
+    missing = [
+        model_feature for form_field, model_feature in FEATURE_MAPPING.items()
+        if form_field not in chunk.columns and model_feature not in chunk.columns
+    ]
+    if missing:
+        raise ValueError(f"Input is missing feature columns: {', '.join(missing)}")
+
+    probabilities = predict_default_proba(_loaded_model, chunk, prefer_scorer=True)
+    scores = calculate_credit_scores(probabilities)
+    return chunk.assign(
+        probability_default=probabilities,
+        credit_score=scores,
+        risk_level=determine_risk_levels(scores),
+        decision=determine_decisions(scores)
+    )
+
+
+def _file_format(path: str, explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def read_chunks(path: str, file_format: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file as they arrive"""
+
+    def __init__(self, path: str, file_format: str):
+        self.path = path
+        self.file_format = file_format
+        self._file = None
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        if self.file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            header = self._file is None
+            if header:
+                self._file = open(self.path, "w", newline="")
+            df.to_csv(self._file, header=header, index=False)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    model_path: str = DEFAULT_MODEL_PATH,
+    workers: int = 1,
+    chunk_size: int = 50000,
+    input_format: Optional[str] = None,
+    output_format: Optional[str] = None
+) -> dict:
+    """Score ``input_path`` into ``output_path`` and return row count and throughput"""
+    chunks = read_chunks(input_path, _file_format(input_path, input_format), chunk_size)
+    writer = ChunkWriter(output_path, _file_format(output_path, output_format))
+    rows = 0
+    start = time.perf_counter()
+
+    def _record(scored: pd.DataFrame):
+        nonlocal rows
+        writer.write(scored)
+        rows += len(scored)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Scored {rows} rows ({rows / elapsed:.0f} rows/sec)")
+
+    try:
+        if workers <= 1:
+            load_model(model_path)
+            for chunk in chunks:
+                _record(score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=load_model, initargs=(model_path,)) as pool:
+                # Bounded look-ahead keeps memory flat and output in input order
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(pool.submit(score_chunk, chunk))
+                    if len(in_flight) >= workers * 2:
+                        _record(in_flight.popleft().result())
+                while in_flight:
+                    _record(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of credit applications")
+    parser.add_argument("input", help="CSV or Parquet file to score")
+    parser.add_argument("output", help="Destination CSV or Parquet file")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Joblib pickle or array artifact directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk")
+    parser.add_argument("--input-format", choices=["csv", "parquet"], help="Override format detection")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], help="Override format detection")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    summary = score_file(
+        args.input,
+        args.output,
+        model_path=args.model,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        input_format=args.input_format,
+        output_format=args.output_format
+    )
+    logger.info(
+        f"Done: {summary['rows']} rows in {summary['seconds']}s ({summary['rows_per_sec']} rows/sec)"
+    )
+
+
+if __name__ == "__main__":
+    main()
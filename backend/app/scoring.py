@@ -0,0 +1,160 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .inference import FLAG_LABELS, TRUE_VALUES, CategoryEncoder
+
+# Scoring helpers shared by the API and offline scoring; importing this module has no side effects
+
+# Feature mapping
+FEATURE_MAPPING = {
+    "age": "age",
+    "income": "income",
+    "loanAmount": "loan_amount",
+    "interestRate": "interest_rate",
+    "turnover": "turnover",
+    "customerTenure": "customer_tenure",
+    "avgDaysLateCurrent": "avg_days_late_current",
+    "numLatePaymentsCurrent": "num_late_payments_current",
+    "unpaidAmount": "unpaid_amount",
+    "industrySector": "industry_sector",
+    "creditType": "credit_type",
+    "hasGuarantee": "has_guarantee",
+    "guaranteeType": "guarantee_type",
+    "repaymentFrequency": "repayment_frequency"
+}
+
+# Same bands as determine_risk_level, for the vectorized version
+RISK_LEVEL_THRESHOLDS = [(750, "Very Low"), (650, "Low"), (550, "Medium"), (450, "High")]
+
+
+def preprocess_frame(raw_df: pd.DataFrame, num_cols: Iterable[str]) -> pd.DataFrame:
+    """
+    Form payload columns (or columns already named like the model features, as
+    in the training CSV) to model input format; the single source of this
+    mapping for /predict, /predict/batch and offline scoring
+    """
+    num_cols = set(num_cols)
+    input_df = pd.DataFrame(index=raw_df.index)
+
+    for form_field, model_feature in FEATURE_MAPPING.items():
+        if form_field in raw_df.columns:
+            column = raw_df[form_field]
+        elif model_feature in raw_df.columns:
+            column = raw_df[model_feature]
+        else:
+            continue
+
+        if model_feature in num_cols:
+            input_df[model_feature] = column.astype(float)
+        elif model_feature == 'has_guarantee':
+            flags = column.astype(str).str.lower().isin(TRUE_VALUES)
+            input_df[model_feature] = flags.map({False: FLAG_LABELS[0], True: FLAG_LABELS[1]})
+        else:
+            # Missing values stay missing so the encoder maps them like CategoryEncoder.encode(None)
+            input_df[model_feature] = column.astype(str).where(column.notna(), None)
+
+    return input_df
+
+
+def preprocess_record(data: dict, num_cols: Iterable[str]) -> pd.DataFrame:
+    """One form payload to a one-row model input frame, through preprocess_frame"""
+    return preprocess_frame(pd.DataFrame([data]), num_cols)
+
+
+def encode_frame(df: pd.DataFrame, encoder: CategoryEncoder, cat_cols: Iterable[str]) -> pd.DataFrame:
+    """Encode the categorical columns of a frame in place, one vectorized pass per column"""
+    for col in cat_cols:
+        if col in df.columns:
+            df[col] = encoder.encode_many(col, df[col])
+
+    return df
+
+
+def predict_default_proba(loaded, raw_df: pd.DataFrame, prefer_scorer: bool = False) -> np.ndarray:
+    """
+    Probabilities of default for a frame of raw applications using a
+    ``model_artifact.LoadedModel``; the sklearn model is used when loaded unless
+    ``prefer_scorer`` asks for the compiled path
+    """
+    input_df = preprocess_frame(raw_df, loaded.num_cols)
+    input_df = encode_frame(input_df, loaded.encoder, loaded.cat_cols)
+    scorer = loaded.scorer
+    if scorer is not None and (prefer_scorer or loaded.model is None):
+        return scorer.predict_proba(input_df[scorer.feature_names].to_numpy(dtype=np.float64))
+    return loaded.model.predict_proba(input_df)[:, 1]
+
+
+def calculate_credit_score(prob_default: float) -> int:
+    """Convert probability of default to credit score (300-850)"""
+    odds = (1 - prob_default) / (prob_default + 1e-9)
+    score = 300 + (50 * np.log10(odds))
+    return int(np.clip(score, 300, 850))
+
+
+def calculate_credit_scores(prob_default: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_credit_score"""
+    prob_default = np.asarray(prob_default, dtype=np.float64)
+    odds = (1 - prob_default) / (prob_default + 1e-9)
+    scores = 300 + (50 * np.log10(odds))
+    return np.clip(scores, 300, 850).astype(np.int64)
+
+
+def determine_risk_level(score: int) -> str:
+    """Categorize risk based on credit score"""
+    if score >= 750:
+        return "Very Low"
+    elif score >= 650:
+        return "Low"
+    elif score >= 550:
+        return "Medium"
+    elif score >= 450:
+        return "High"
+    return "Very High"
+
+
+def determine_risk_levels(scores: np.ndarray) -> np.ndarray:
+    """Vectorized determine_risk_level"""
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= threshold for threshold, _ in RISK_LEVEL_THRESHOLDS],
+        [level for _, level in RISK_LEVEL_THRESHOLDS],
+        default="Very High"
+    )
+
+
+def determine_decision(score: int) -> str:
+    """Map a credit score to the lending decision"""
+    return "approved" if score >= 650 else "approved with conditions" if score >= 550 else "declined"
+
+
+def determine_decisions(scores: np.ndarray) -> np.ndarray:
+    """Vectorized determine_decision"""
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= 650, scores >= 550],
+        ["approved", "approved with conditions"],
+        default="declined"
+    )
+
+
+def get_key_factors(input_data: dict) -> dict:
+    """Generate key positive/negative factors for decision"""
+    factors = {"positive": [], "negative": []}
+
+    if input_data.get('income', 0) > 100000:
+        factors["positive"].append("High income")
+    if input_data.get('customer_tenure', 0) > 24:
+        factors["positive"].append("Long customer tenure")
+
+    if input_data.get('avg_days_late_current', 0) > 15:
+        factors["negative"].append("Frequent late payments")
+    if input_data.get('num_late_payments_current', 0) > 3:
+        factors["negative"].append("Multiple late payments")
+
+    debt_ratio = input_data.get('loan_amount', 0) / max(input_data.get('income', 1), 1)
+    if debt_ratio > 0.35:
+        factors["negative"].append(f"High debt ratio ({debt_ratio:.0%})")
+
+    return factors
@@ -0,0 +1,63 @@
+"""
+Verified-token cache. Run from backend/:
+
+    python -m pytest app/test_auth.py
+"""
+import time
+
+from app.auth import TokenCache
+
+
+def test_hit_until_expiry():
+    cache = TokenCache(max_size=10)
+    cache.put("fresh", "alice", 1, time.time() + 60)
+    cache.put("stale", "alice", 1, time.time() - 1)
+
+    assert cache.get("fresh") == "alice"
+    assert cache.get("stale") is None
+    # An expired entry is evicted on lookup, not just hidden
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_invalidate_user_drops_only_that_users_tokens():
+    cache = TokenCache(max_size=10)
+    expires_at = time.time() + 60
+    cache.put("a1", "alice", 1, expires_at)
+    cache.put("a2", "alice", 1, expires_at)
+    cache.put("b1", "bob", 2, expires_at)
+
+    cache.invalidate_user(1)
+
+    assert cache.get("a1") is None
+    assert cache.get("a2") is None
+    assert cache.get("b1") == "bob"
+    # Nothing left to invalidate is not an error
+    cache.invalidate_user(1)
+    cache.invalidate_user(3)
+
+
+def test_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.put("t1", "alice", 1, expires_at)
+    cache.put("t2", "bob", 2, expires_at)
+    cache.get("t1")
+    cache.put("t3", "carol", 3, expires_at)
+
+    assert cache.get("t2") is None
+    assert cache.get("t1") == "alice"
+    assert cache.get("t3") == "carol"
+    # The evicted token no longer counts against its user
+    cache.invalidate_user(2)
+    assert cache.stats()["size"] == 2
+
+
+def test_put_again_replaces_entry_and_owner():
+    cache = TokenCache(max_size=10)
+    expires_at = time.time() + 60
+    cache.put("token", "alice", 1, expires_at)
+    cache.put("token", "alice-renamed", 1, expires_at)
+
+    assert cache.get("token") == "alice-renamed"
+    cache.invalidate_user(1)
+    assert cache.get("token") is None
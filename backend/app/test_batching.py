@@ -0,0 +1,88 @@
+"""
+Micro-batching of concurrent scoring calls. Run from backend/:
+
+    python -m pytest app/test_batching.py
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+from app.executors import BoundedExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("test-inference", max_workers=2, max_queue=16)
+    yield executor
+    executor.shutdown()
+
+
+def _first_column(matrix: np.ndarray) -> np.ndarray:
+    return matrix[:, 0] * 10
+
+
+def test_each_caller_gets_its_own_row(executor):
+    batcher = MicroBatcher(_first_column, executor, window_ms=20, max_batch_size=64)
+
+    async def _run():
+        return await asyncio.gather(*(batcher.submit(np.array([float(i), -1.0])) for i in range(40)))
+
+    results = asyncio.run(_run())
+
+    assert results == [i * 10 for i in range(40)]
+    stats = batcher.stats()
+    # All 40 arrived inside one window
+    assert stats["batch_size"]["count"] == 1
+    assert stats["pending"] == 0
+
+
+def test_full_batches_dispatch_without_waiting_for_the_window(executor):
+    batcher = MicroBatcher(_first_column, executor, window_ms=10000, max_batch_size=4)
+
+    async def _run():
+        vectors = [np.array([float(i)]) for i in range(8)]
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(v) for v in vectors)), timeout=5)
+
+    assert asyncio.run(_run()) == [i * 10 for i in range(8)]
+    assert batcher.stats()["batch_size"]["count"] == 2
+
+
+def test_rows_for_different_models_are_scored_separately(executor):
+    calls = []
+
+    def _model(scale):
+        def _score(matrix):
+            calls.append((scale, len(matrix)))
+            return matrix[:, 0] * scale
+        return _score
+
+    old_model, new_model = _model(1), _model(100)
+    batcher = MicroBatcher(old_model, executor, window_ms=20, max_batch_size=64)
+
+    async def _run():
+        return await asyncio.gather(
+            batcher.submit(np.array([1.0])),
+            batcher.submit(np.array([2.0]), new_model),
+            batcher.submit(np.array([3.0])),
+            batcher.submit(np.array([4.0]), new_model),
+        )
+
+    assert asyncio.run(_run()) == [1, 200, 3, 400]
+    assert sorted(calls) == [(1, 2), (100, 2)]
+
+
+def test_scoring_errors_reach_every_caller_in_the_batch(executor):
+    def _broken(matrix):
+        raise ValueError("model exploded")
+
+    batcher = MicroBatcher(_broken, executor, window_ms=20, max_batch_size=64)
+
+    async def _run():
+        return await asyncio.gather(
+            *(batcher.submit(np.array([1.0])) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(_run())
+    assert all(isinstance(result, ValueError) for result in results)
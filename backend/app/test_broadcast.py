@@ -0,0 +1,118 @@
+"""
+WebSocket broadcast hub routing and backpressure. Run from backend/:
+
+    python -m pytest app/test_broadcast.py
+"""
+import asyncio
+import json
+
+from app.broadcast import BroadcastHub, ClientConnection, Subscription, Topic
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+async def _settle():
+    # Let the dispatcher and sender tasks drain
+    await asyncio.sleep(0.05)
+
+
+def test_events_reach_only_matching_subscriptions():
+    async def _run():
+        hub = BroadcastHub()
+        await hub.start()
+        everything = RecordingWebSocket()
+        high_risk = RecordingWebSocket()
+        declined_high = RecordingWebSocket()
+        other_user = RecordingWebSocket()
+        await hub.connect(everything, Subscription([1]))
+        await hub.connect(high_risk, Subscription([1], risk_levels=["High", "very high"]))
+        await hub.connect(declined_high, Subscription([1], risk_levels=["high"], decisions=["Declined"]))
+        await hub.connect(other_user, Subscription([2, None]))
+
+        hub.publish({"id": 1}, Topic(1, "High", "declined"))
+        hub.publish({"id": 2}, Topic(1, "low", "approved"))
+        hub.publish({"id": 3}, Topic(None, "high", "declined"))
+        hub.publish({"id": 4})
+        await _settle()
+        await hub.stop()
+        return everything, high_risk, declined_high, other_user
+
+    everything, high_risk, declined_high, other_user = asyncio.run(_run())
+    assert [m["id"] for m in everything.sent] == [1, 2, 4]
+    assert [m["id"] for m in high_risk.sent] == [1, 4]
+    assert [m["id"] for m in declined_high.sent] == [1, 4]
+    assert [m["id"] for m in other_user.sent] == [3, 4]
+
+
+def test_resubscribe_and_disconnect_clean_the_index():
+    async def _run():
+        hub = BroadcastHub()
+        await hub.start()
+        websocket = RecordingWebSocket()
+        client = await hub.connect(websocket, Subscription([1], risk_levels=["high", "low"]))
+        keys_before = hub.stats()["subscription_keys"]
+
+        hub.subscribe(client, Subscription([1], decisions=["approved"]))
+        hub.publish({"id": 1}, Topic(1, "high", "declined"))
+        hub.publish({"id": 2}, Topic(1, "medium", "approved"))
+        await _settle()
+        keys_after = hub.stats()["subscription_keys"]
+
+        await hub.disconnect(client)
+        remaining = hub.stats()
+        await hub.stop()
+        return websocket, keys_before, keys_after, remaining
+
+    websocket, keys_before, keys_after, remaining = asyncio.run(_run())
+    assert [m["id"] for m in websocket.sent] == [2]
+    assert (keys_before, keys_after) == (2, 1)
+    assert remaining["subscription_keys"] == 0
+    assert remaining["connections"] == 0
+
+
+def test_full_queue_drops_the_oldest_message():
+    async def _run():
+        client = ClientConnection(RecordingWebSocket(), queue_size=2)
+        accepted = [client.offer(text) for text in ["a", "b", "c", "d"]]
+        return accepted, [client.queue.get_nowait() for _ in range(client.queue.qsize())], client.consecutive_drops
+
+    accepted, queued, drops = asyncio.run(_run())
+    assert accepted == [True, True, False, False]
+    assert queued == ["c", "d"]
+    assert drops == 2
+
+
+def test_client_that_cannot_keep_up_is_disconnected():
+    class StalledWebSocket(RecordingWebSocket):
+        async def send_text(self, text: str):
+            await asyncio.Event().wait()
+
+    async def _run():
+        hub = BroadcastHub(queue_size=1, max_consecutive_drops=3, send_timeout=60)
+        await hub.start()
+        websocket = StalledWebSocket()
+        await hub.connect(websocket, Subscription([1]))
+        for i in range(6):
+            hub.publish({"id": i}, Topic(1, "low", "approved"))
+        await _settle()
+        stats = hub.stats()
+        await hub.stop()
+        return websocket, stats
+
+    websocket, stats = asyncio.run(_run())
+    assert websocket.closed
+    assert stats["clients_dropped"] == 1
+    assert stats["connections"] == 0
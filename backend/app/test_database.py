@@ -0,0 +1,42 @@
+"""
+Sync and async engines on an in-memory SQLite database. Run from backend/:
+
+    python -m pytest app/test_database.py
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("PORTFOLIO_RECONCILE_SECONDS", "0")
+
+from fastapi.testclient import TestClient
+
+from app import main, models
+from app.database import SessionLocal
+from app.model_registry import sample_applications
+from app.scoring import FEATURE_MAPPING
+
+
+def _application():
+    application = sample_applications(main.model_registry.active, FEATURE_MAPPING, 1)[0]
+    for field in ("age", "customerTenure", "avgDaysLateCurrent", "numLatePaymentsCurrent"):
+        application[field] = int(round(application[field]))
+    application["age"] = max(application["age"], 19)
+    application.update(
+        client_name="Async Client",
+        employment="employed",
+        loanPurpose="business",
+        location="urban",
+        phoneUsage="medium",
+        utilityPayments="on time",
+    )
+    return application
+
+
+def test_async_endpoint_sees_tables_created_on_the_sync_engine():
+    response = TestClient(main.app).post("/predict", json=_application())
+
+    assert response.status_code == 200
+    # The row written through the async engine is visible to sync sessions
+    with SessionLocal() as db:
+        saved = db.query(models.Prediction).filter(models.Prediction.client_name == "Async Client").all()
+    assert [prediction.credit_score for prediction in saved] == [response.json()["creditScore"]]
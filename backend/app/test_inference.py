@@ -0,0 +1,99 @@
+"""
+Category lookup tables and the compiled scorer. Run from backend/:
+
+    python -m pytest app/test_inference.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.inference import CategoryEncoder, CompiledScorer
+from app.model_artifact import DEFAULT_MODEL_PATH
+from app.scoring import FEATURE_MAPPING, encode_frame, preprocess_frame
+
+
+def _encoder(**kwargs):
+    classes = {"sector": np.array(["Finance_", "Retail_", "<UNK>"]), "term": ["Monthly_", "Quarterly_"]}
+    return CategoryEncoder(classes, ["sector", "term"], **kwargs)
+
+
+def test_known_values_use_class_positions():
+    encoder = _encoder()
+    assert encoder.encode("sector", "Retail_") == 1
+    assert encoder.encode_many("term", ["Quarterly_", "Monthly_"]).tolist() == [1, 0]
+    assert encoder.stats() == {"sector": 0, "term": 0}
+
+
+def test_unseen_values_fall_back_and_are_counted():
+    encoder = _encoder()
+    assert encoder.encode("sector", "Mining_") == 0
+    assert encoder.encode("sector", None) == 0
+    codes = encoder.encode_many("term", pd.Series(["Weekly_", "Monthly_", None, np.nan]))
+
+    assert codes.dtype == np.int64
+    assert codes.tolist() == [0, 0, 0, 0]
+    assert encoder.stats() == {"sector": 2, "term": 3}
+
+
+def test_fallback_label_and_explicit_codes():
+    encoder = _encoder(fallback="<UNK>", fallback_codes={"term": 1})
+    assert encoder.encode("sector", "Mining_") == 2
+    assert encoder.encode("term", "Weekly_") == 1
+    # A fallback label the column does not know keeps the first class
+    assert _encoder(fallback="Quarterly_").encode("sector", "Mining_") == 0
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    joblib = pytest.importorskip("joblib")
+    return joblib.load(DEFAULT_MODEL_PATH)
+
+
+def _probe_payloads(scorer, model_data, size=32):
+    from app.model_registry import SAMPLE_NUMERIC_RANGES
+
+    rng = np.random.default_rng(1)
+    records = []
+    for i in range(size):
+        record = {}
+        for form_field, feature in FEATURE_MAPPING.items():
+            if feature in scorer.cat_cols:
+                classes = model_data['label_encoders'][feature].classes_
+                record[form_field] = str(classes[i % len(classes)])
+            else:
+                record[form_field] = float(rng.uniform(*SAMPLE_NUMERIC_RANGES.get(form_field, (0, 1000))))
+        records.append(record)
+    return records
+
+
+def _reference(model_data, scorer, records):
+    frame = encode_frame(
+        preprocess_frame(pd.DataFrame.from_records(records), model_data['num_cols']),
+        scorer.encoder, model_data['cat_cols']
+    )
+    return model_data['model'].predict_proba(frame[scorer.feature_names])[:, 1]
+
+
+def test_compiled_scorer_is_bit_identical_to_model(model_data):
+    scorer = CompiledScorer(model_data, FEATURE_MAPPING)
+    records = _probe_payloads(scorer, model_data)
+
+    compiled = scorer.predict_proba(scorer.vectorize_many(records))
+    assert np.array_equal(compiled, _reference(model_data, scorer, records))
+
+
+def test_scorer_falls_back_to_frame_mode_when_not_bit_identical(model_data, monkeypatch):
+    original = CompiledScorer._design
+
+    def _perturbed(self, vectors):
+        # A relative error far below any score threshold, but not bit-identical
+        return original(self, vectors) * (1 + 1e-9)
+
+    monkeypatch.setattr(CompiledScorer, "_design", _perturbed)
+    scorer = CompiledScorer(model_data, FEATURE_MAPPING)
+
+    assert scorer.mode == "frame"
+    records = _probe_payloads(scorer, model_data, size=8)
+    assert np.array_equal(
+        scorer.predict_proba(scorer.vectorize_many(records)), _reference(model_data, scorer, records)
+    )
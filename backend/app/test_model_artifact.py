@@ -0,0 +1,82 @@
+"""
+Array model artifact export and loading. Run from backend/:
+
+    python -m pytest app/test_model_artifact.py
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.inference import CompiledScorer
+from app.model_artifact import DEFAULT_MODEL_PATH, MANIFEST_NAME, ArtifactError, export_artifact, load_model
+from app.model_registry import sample_applications
+from app.scoring import FEATURE_MAPPING
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    joblib = pytest.importorskip("joblib")
+    return joblib.load(DEFAULT_MODEL_PATH)
+
+
+@pytest.fixture
+def artifact_dir(model_data, tmp_path):
+    if CompiledScorer(model_data, FEATURE_MAPPING).mode != "linear":
+        pytest.skip("bundled model does not compile to linear mode")
+    path = str(tmp_path / "model_v1")
+    export_artifact(model_data, path, FEATURE_MAPPING, version="1.0-test")
+    return path
+
+
+def test_round_trip_scores_like_the_pickle(artifact_dir):
+    pickled = load_model(DEFAULT_MODEL_PATH, FEATURE_MAPPING)
+    loaded = load_model(artifact_dir, FEATURE_MAPPING)
+
+    assert loaded.version == "1.0-test"
+    assert loaded.info()["format"] == "arrays"
+    assert loaded.model is None
+    assert loaded.num_cols == pickled.num_cols
+    assert loaded.cat_cols == pickled.cat_cols
+    assert loaded.encoder.tables == pickled.encoder.tables
+
+    records = sample_applications(pickled, FEATURE_MAPPING, 64)
+    expected = pickled.scorer.predict_proba(pickled.scorer.vectorize_many(records))
+    actual = loaded.scorer.predict_proba(loaded.scorer.vectorize_many(records))
+    assert np.array_equal(actual, expected)
+    # Loading through the manifest path is the same artifact
+    assert load_model(os.path.join(artifact_dir, MANIFEST_NAME), FEATURE_MAPPING).checksum == loaded.checksum
+
+
+def test_corrupt_array_is_rejected(artifact_dir):
+    with open(os.path.join(artifact_dir, "coef.npy"), "r+b") as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(b"\x00" * 8)
+
+    with pytest.raises(ArtifactError, match="coef.npy"):
+        load_model(artifact_dir, FEATURE_MAPPING)
+
+
+def test_edited_manifest_is_rejected(artifact_dir):
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["files"]["coef.npy"] = "0" * 64
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ArtifactError, match="Manifest checksum"):
+        load_model(artifact_dir, FEATURE_MAPPING)
+
+
+def test_unknown_format_is_rejected(artifact_dir):
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["format"] = 99
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ArtifactError, match="Unsupported artifact format"):
+        load_model(artifact_dir, FEATURE_MAPPING)
@@ -0,0 +1,80 @@
+"""
+Keyset pagination of prediction history. Run from backend/:
+
+    python -m pytest app/test_pagination.py
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models
+from app.database import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _add_predictions(db, user_id, timestamps):
+    for i, timestamp in enumerate(timestamps):
+        db.add(models.Prediction(
+            client_name=f"Client {i}", credit_score=600, risk_level="medium",
+            decision="approved", user_id=user_id, timestamp=timestamp
+        ))
+    db.commit()
+
+
+def test_cursor_round_trip():
+    prediction = models.Prediction(id=42, timestamp=datetime(2024, 5, 1, 12, 30, 15, 123456))
+    assert crud.decode_cursor(crud.encode_cursor(prediction)) == (prediction.timestamp, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "WyJub3QtYS1kYXRlIiwgMV0="])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        crud.decode_cursor(cursor)
+
+
+def test_pages_have_no_duplicates_or_gaps_when_timestamps_tie(db):
+    base = datetime(2024, 1, 1)
+    # Groups of identical timestamps straddle every page boundary
+    timestamps = [base + timedelta(minutes=i // 4) for i in range(23)]
+    _add_predictions(db, 1, timestamps)
+    _add_predictions(db, 2, timestamps[:5])
+
+    seen = []
+    after = None
+    while True:
+        page = crud.get_predictions(db, user_id=1, limit=5, after=after)
+        seen.extend(page)
+        if len(page) < 5:
+            break
+        after = crud.encode_cursor(page[-1])
+
+    ids = [prediction.id for prediction in seen]
+    assert len(ids) == len(set(ids)) == 23
+    assert all(prediction.user_id == 1 for prediction in seen)
+    keys = [(prediction.timestamp, prediction.id) for prediction in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_skip_with_cursor_is_rejected(db):
+    _add_predictions(db, 1, [datetime(2024, 1, 1)] * 3)
+    first = crud.get_predictions(db, user_id=1, limit=1)
+    with pytest.raises(ValueError):
+        crud.get_predictions(db, user_id=1, skip=1, limit=1, after=crud.encode_cursor(first[0]))
@@ -0,0 +1,56 @@
+"""
+In-memory portfolio aggregates. Run from backend/:
+
+    python -m pytest app/test_portfolio.py
+"""
+from app.portfolio import STAT_FIELDS, PortfolioStats
+
+
+def test_record_updates_totals_and_user():
+    stats = PortfolioStats()
+    stats.record(720, "Low", "approved", 1)
+    stats.record(500, "High", "declined", 1)
+    stats.record(600, "Medium", "Approved with conditions", None)
+
+    totals = stats.snapshot()
+    assert totals["total"] == 3
+    assert totals["score_sum"] == 1820
+    assert totals["high_risk"] == 1
+    assert totals["medium_risk"] == 1
+    assert (totals["score_high_risk"], totals["score_medium_risk"], totals["score_low_risk"]) == (1, 1, 1)
+    assert (totals["approved"], totals["approved_with_conditions"], totals["declined"]) == (1, 1, 1)
+
+    user = stats.snapshot(1, per_user=True)
+    assert user["total"] == 2
+    assert user["score_sum"] == 1220
+    assert stats.count(1) == 2
+    assert stats.count() == 3
+    assert stats.snapshot(42, per_user=True) == {field: 0 for field in STAT_FIELDS}
+
+
+def test_remove_undoes_record():
+    stats = PortfolioStats()
+    stats.record(720, "low", "approved", 1)
+    before = stats.snapshot()
+    stats.record(455, "very high", "declined", 1)
+    stats.remove(455, "very high", "declined", 1)
+
+    assert stats.snapshot() == before
+    assert stats.count(1) == 1
+
+
+def test_load_replaces_everything():
+    stats = PortfolioStats()
+    stats.record(720, "low", "approved", 99)
+    rows = [
+        {**{field: 1 for field in STAT_FIELDS}, "user_id": 1, "total": 4, "score_sum": 2600},
+        {**{field: 0 for field in STAT_FIELDS}, "user_id": None, "total": 2, "score_sum": 1300},
+    ]
+    stats.load(rows)
+
+    assert stats.seeded
+    assert stats.count() == 6
+    assert stats.count(1) == 4
+    assert stats.count(99) == 0
+    assert stats.snapshot()["score_sum"] == 3900
+    assert stats.snapshot(None, per_user=True)["total"] == 2
@@ -0,0 +1,90 @@
+"""
+POST /predict/batch against the app in-process, on an in-memory SQLite
+database. Run from backend/:
+
+    python -m pytest app/test_predict_batch.py
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("PORTFOLIO_RECONCILE_SECONDS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.model_registry import sample_applications
+from app.scoring import FEATURE_MAPPING
+
+EXTRA_FIELDS = {
+    "employment": "employed",
+    "loanPurpose": "business",
+    "location": "urban",
+    "phoneUsage": "medium",
+    "utilityPayments": "on time",
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def _applications(size):
+    applications = sample_applications(main.model_registry.active, FEATURE_MAPPING, size)
+    for i, application in enumerate(applications):
+        for field in ("age", "customerTenure", "avgDaysLateCurrent", "numLatePaymentsCurrent"):
+            application[field] = int(round(application[field]))
+        application["age"] = max(application["age"], 19)
+        application["client_name"] = f"Batch Client {i}"
+        application.update(EXTRA_FIELDS)
+    return applications
+
+
+def test_invalid_rows_are_reported_without_failing_the_batch(client):
+    applications = _applications(5)
+    applications[1]["age"] = 12
+    del applications[3]["income"]
+    applications[4]["loanAmount"] = "lots"
+
+    response = client.post("/predict/batch", json={"applications": applications})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["scored"], body["failed"]) == (5, 2, 3)
+    assert body["modelVersion"] == main.model_registry.active.version
+
+    results = body["results"]
+    assert [result["index"] for result in results] == list(range(5))
+    for i in (0, 2):
+        assert results[i]["errors"] is None
+        assert results[i]["client"] == f"Batch Client {i}"
+        assert 300 <= results[i]["creditScore"] <= 850
+        assert results[i]["predictionId"] is not None
+    assert any(error.startswith("age:") for error in results[1]["errors"])
+    assert any(error.startswith("income:") for error in results[3]["errors"])
+    assert any(error.startswith("loanAmount:") for error in results[4]["errors"])
+    for i in (1, 3, 4):
+        assert results[i]["creditScore"] is None
+        assert results[i]["predictionId"] is None
+
+
+def test_batch_scores_match_single_row_scoring(client):
+    applications = _applications(8)
+    body = client.post("/predict/batch", json={"applications": applications}).json()
+
+    for application, result in zip(applications, body["results"]):
+        assert result["creditScore"] == main.score_application(application).credit_score
+
+
+def test_oversized_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 3)
+
+    response = client.post("/predict/batch", json={"applications": _applications(4)})
+
+    assert response.status_code == 413
+    assert client.post("/predict/batch", json={"applications": _applications(3)}).status_code == 200
+
+
+def test_empty_batch_is_rejected(client):
+    assert client.post("/predict/batch", json={"applications": []}).status_code == 400
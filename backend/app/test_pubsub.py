@@ -0,0 +1,93 @@
+"""
+Cross-worker broadcast backends. Run from backend/:
+
+    python -m pytest app/test_pubsub.py
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import asyncio
+import json
+
+from app.broadcast import Topic
+from app.pubsub import NOTIFY_PAYLOAD_LIMIT, PostgresNotifyBackend, chunk_events
+
+
+def _payload_size(chunk):
+    return len(("[" + ",".join(chunk) + "]").encode("utf-8"))
+
+
+def test_chunks_fit_the_notify_limit_and_keep_order():
+    events = [json.dumps({"id": i, "pad": "é" * (i % 100)}) for i in range(200)]
+    chunks = chunk_events(events, limit=1000)
+
+    assert len(chunks) > 1
+    assert [event for chunk in chunks for event in chunk] == events
+    assert all(_payload_size(chunk) <= 1000 for chunk in chunks)
+
+
+def test_event_of_exactly_the_limit_gets_its_own_chunk():
+    exact = "x" * (NOTIFY_PAYLOAD_LIMIT - 2)
+    chunks = chunk_events(["1", exact, "2"])
+
+    assert chunks == [["1"], [exact], ["2"]]
+    assert all(_payload_size(chunk) <= NOTIFY_PAYLOAD_LIMIT for chunk in chunks)
+
+
+class FakeConnection:
+    def __init__(self, fail_after=None):
+        self.payloads = []
+        self.fail_after = fail_after
+
+    async def execute(self, query, channel, payload):
+        if self.fail_after is not None and len(self.payloads) >= self.fail_after:
+            raise ConnectionError("connection lost")
+        assert len(payload.encode("utf-8")) <= NOTIFY_PAYLOAD_LIMIT
+        self.payloads.append(payload)
+
+
+def _backend(connection):
+    delivered = []
+    backend = PostgresNotifyBackend("postgresql://unused")
+    backend._deliver = lambda message, topic: delivered.append((message, topic))
+    backend._connection = connection
+    return backend, delivered
+
+
+def _publish_many(backend, count):
+    for i in range(count):
+        backend.publish({"id": i, "pad": "p" * 500}, Topic(1, "low", "approved"))
+
+
+def test_flush_sends_chunked_notifies_that_round_trip():
+    connection = FakeConnection()
+    backend, delivered = _backend(connection)
+    _publish_many(backend, 50)
+    asyncio.run(backend._flush())
+
+    assert len(connection.payloads) > 1
+    assert backend.events_sent == 50
+    assert delivered == []
+
+    # What listeners receive decodes back into the original events
+    received, listener = [], PostgresNotifyBackend("postgresql://unused")
+    listener._deliver = lambda message, topic: received.append((message, topic))
+    for payload in connection.payloads:
+        listener._on_notify(None, 0, "credit_events", payload)
+    assert [message["id"] for message, _ in received] == list(range(50))
+    assert all(topic == Topic(1, "low", "approved") for _, topic in received)
+
+
+def test_oversized_and_unsent_events_are_delivered_locally():
+    connection = FakeConnection(fail_after=1)
+    backend, delivered = _backend(connection)
+    backend.publish({"id": "huge", "pad": "x" * NOTIFY_PAYLOAD_LIMIT})
+    _publish_many(backend, 50)
+    asyncio.run(backend._flush())
+
+    sent = sum(len(json.loads(payload)) for payload in connection.payloads)
+    assert delivered[0][0]["id"] == "huge"
+    # Everything after the failed NOTIFY stays visible to this worker's clients
+    assert [message["id"] for message, _ in delivered[1:]] == list(range(sent, 50))
+    assert backend.local_fallbacks == 1 + 50 - sent
@@ -0,0 +1,64 @@
+"""
+Scoring result cache. Run from backend/:
+
+    python -m pytest app/test_result_cache.py
+"""
+from types import SimpleNamespace
+
+from app.result_cache import ResultCache, result_key, score_result
+
+FEATURES = {"age": 35.0, "income": 4200.0, "industry_sector": 3, "has_guarantee": 1}
+
+
+def _model(version, checksum):
+    return SimpleNamespace(version=version, checksum=checksum)
+
+
+def test_key_ignores_feature_order_and_int_float_spelling():
+    model = _model("1.0", "abc")
+    reordered = {name: FEATURES[name] for name in reversed(list(FEATURES))}
+    respelled = {**FEATURES, "industry_sector": 3.0, "age": 35}
+
+    assert result_key(model, FEATURES) == result_key(model, reordered) == result_key(model, respelled)
+    assert result_key(model, FEATURES) != result_key(model, {**FEATURES, "income": 4200.5})
+
+
+def test_reload_and_rollback_never_serve_another_models_result():
+    cache = ResultCache(max_entries=10)
+    old, new = _model("1.0", "aaa"), _model("1.1", "bbb")
+    old_result = cache.put(result_key(old, FEATURES), score_result(0.2, FEATURES))
+
+    # After a reload the same features miss, even though the version string alone could collide
+    assert cache.get(result_key(new, FEATURES)) is None
+    assert cache.get(result_key(_model("1.0", "ccc"), FEATURES)) is None
+    cache.put(result_key(new, FEATURES), score_result(0.6, FEATURES))
+
+    # Rolling back makes the old model's entry live again, untouched by the new model's
+    assert cache.get(result_key(old, FEATURES)) == old_result
+    assert cache.get(result_key(new, FEATURES)).prob_default == 0.6
+
+
+def test_lru_eviction_and_stats():
+    cache = ResultCache(max_entries=2)
+    model = _model("1.0", "abc")
+    keys = [result_key(model, {**FEATURES, "age": float(age)}) for age in (20, 30, 40)]
+    for key in keys[:2]:
+        cache.put(key, score_result(0.1, FEATURES))
+    cache.get(keys[0])
+    cache.put(keys[2], score_result(0.1, FEATURES))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_zero_size_disables_caching():
+    cache = ResultCache(max_entries=0)
+    key = result_key(_model("1.0", "abc"), FEATURES)
+    result = score_result(0.3, FEATURES)
+
+    assert cache.put(key, result) is result
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
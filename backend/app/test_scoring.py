@@ -0,0 +1,68 @@
+"""
+Feature preprocessing and scoring against the bundled model. Run from backend/:
+
+    python -m pytest app/test_scoring.py
+"""
+import pandas as pd
+import pytest
+
+from app.inference import UNSEEN_CATEGORY_FALLBACK
+from app.model_artifact import DEFAULT_MODEL_PATH, load_model
+from app.model_registry import sample_applications
+from app.scoring import FEATURE_MAPPING, encode_frame, preprocess_frame, preprocess_record
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    return load_model(DEFAULT_MODEL_PATH, FEATURE_MAPPING, fallback=UNSEEN_CATEGORY_FALLBACK)
+
+
+def _applications(loaded, size=40):
+    records = sample_applications(loaded, FEATURE_MAPPING, size)
+    # Payload shapes clients actually send: booleans, strings for numbers, unknown labels
+    records[0]["hasGuarantee"] = True
+    records[1]["hasGuarantee"] = "yes"
+    records[2]["hasGuarantee"] = "1"
+    records[3]["hasGuarantee"] = False
+    records[4]["age"] = "42"
+    records[5]["income"] = 52000
+    records[6]["industrySector"] = "not-a-sector"
+    records[7]["creditType"] = None
+    records[8]["guaranteeType"] = float("nan")
+    return records
+
+
+def _encode_one(loaded, data):
+    df = encode_frame(preprocess_record(data, loaded.num_cols), loaded.encoder, loaded.cat_cols)
+    return df.iloc[0].to_dict()
+
+
+def test_single_row_matches_batch_encoding(loaded):
+    records = _applications(loaded)
+    batch = encode_frame(
+        preprocess_frame(pd.DataFrame.from_records(records), loaded.num_cols), loaded.encoder, loaded.cat_cols
+    )
+    for i, data in enumerate(records):
+        assert _encode_one(loaded, data) == batch.iloc[i].to_dict()
+
+
+def test_compiled_vectorize_matches_frame_encoding(loaded):
+    if loaded.scorer is None:
+        pytest.skip("model has no compiled scorer")
+    for data in _applications(loaded):
+        features = loaded.scorer.feature_dict(loaded.scorer.vectorize(data))
+        assert features == {name: float(value) for name, value in _encode_one(loaded, data).items()}
+
+
+def test_has_guarantee_spellings_collapse_to_one_flag(loaded):
+    data = _applications(loaded)[0]
+
+    def _flag(value):
+        data["hasGuarantee"] = value
+        return _encode_one(loaded, data)["has_guarantee"]
+
+    yes = {_flag(value) for value in ["Yes", "TRUE", "1", True]}
+    no = {_flag(value) for value in ["No", "0", False, "maybe"]}
+    assert yes == {loaded.encoder.encode("has_guarantee", "True_")}
+    assert no == {loaded.encoder.encode("has_guarantee", "False_")}
+    assert yes != no
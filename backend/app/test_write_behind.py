@@ -0,0 +1,93 @@
+"""
+Write-behind prediction persistence. Run from backend/:
+
+    python -m pytest app/test_write_behind.py
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import asyncio
+from datetime import datetime
+
+from app.write_behind import PredictionWriter
+
+
+class FakeWriter(PredictionWriter):
+    """Records inserted rows instead of touching the database; fails while ``failing`` is set"""
+
+    def __init__(self, spool_path, failing=False, **kwargs):
+        super().__init__(spool_path=spool_path, max_retries=1, flush_ms=5, **kwargs)
+        self.failing = failing
+        self.inserted = []
+        self.attempts = 0
+
+    async def _insert(self, rows):
+        self.attempts += 1
+        if self.failing:
+            raise ConnectionError("database unavailable")
+        first_id = len(self.inserted) + 1
+        self.inserted.extend(rows)
+        return list(range(first_id, first_id + len(rows)))
+
+
+def _row(i):
+    return {
+        "client_name": f"Client {i}",
+        "credit_score": 600 + i,
+        "risk_level": "medium",
+        "decision": "approved with conditions",
+        "income": 1000.0 * i,
+        "loan_amount": None,
+        "interest_rate": None,
+        "employment": "employed",
+        "loan_purpose": "home",
+        "user_id": None,
+        "timestamp": datetime(2024, 1, 1, 12, 0, i),
+    }
+
+
+def test_batches_rows_and_reports_ids(tmp_path):
+    writer = FakeWriter(str(tmp_path / "spool.jsonl"), batch_size=4)
+    saved = {}
+
+    async def _run():
+        await writer.start()
+        for i in range(10):
+            await writer.submit(_row(i), lambda prediction_id, i=i: saved.__setitem__(i, prediction_id))
+        await writer.stop()
+
+    asyncio.run(_run())
+    assert [row["client_name"] for row in writer.inserted] == [f"Client {i}" for i in range(10)]
+    assert saved == {i: i + 1 for i in range(10)}
+    assert writer.stats()["written"] == 10
+    assert writer.stats()["batches"] >= 3
+
+
+def test_failed_batches_are_spooled_and_replayed_on_start(tmp_path):
+    spool_path = str(tmp_path / "spool.jsonl")
+    failing = FakeWriter(spool_path, failing=True)
+    callbacks = []
+
+    async def _fail():
+        await failing.start()
+        for i in range(3):
+            await failing.submit(_row(i), callbacks.append)
+        await failing.stop()
+
+    asyncio.run(_fail())
+    assert callbacks == []
+    assert failing.stats()["spooled"] == 3
+    assert failing.attempts == 2 * failing.stats()["failed_batches"]
+    assert os.path.exists(spool_path)
+
+    recovered = FakeWriter(spool_path)
+
+    async def _replay():
+        await recovered.start()
+        await recovered.stop()
+
+    asyncio.run(_replay())
+    assert recovered.inserted == [_row(i) for i in range(3)]
+    assert recovered.stats()["replayed"] == 3
+    assert not os.path.exists(spool_path)
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from .crud import bulk_insert_statement
+from .database import AsyncSessionLocal
+from .metrics import metrics
+from .portfolio import portfolio_stats
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ['yes', 'true', '1']
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "3"))
+# Rows that could not be inserted are appended here and replayed on the next start; defaults to
+# the app directory next to the bundled model, whatever directory the server was started from
+WRITE_BEHIND_SPOOL_PATH = os.path.abspath(os.getenv(
+    "WRITE_BEHIND_SPOOL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prediction_spool.jsonl")
+))
+
+
+def _spool_line(row: dict) -> str:
+    return json.dumps({**row, "timestamp": row["timestamp"].isoformat()})
+
+
+def _parse_spool_line(line: str) -> dict:
+    row = json.loads(line)
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class PredictionWriter:
+    """
+    Write-behind persistence of /predict results.
+
+    ``submit`` queues a prediction row and returns immediately, so request
+    latency no longer includes a commit. A background task collects rows
+    until ``batch_size`` is reached or ``flush_ms`` has passed since the
+    first one arrived, inserts them with one multi-row INSERT ... RETURNING,
+    and then calls each row's ``on_saved`` with its new id.
+
+    A full queue makes ``submit`` wait for the flusher (backpressure), never
+    drop. A batch that still fails after ``max_retries`` is appended to the
+    spool file and replayed on the next ``start``; ``stop`` drains the queue
+    before returning. Rows still queued when the process is killed are lost,
+    which is the price of not committing inside the request.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WRITE_BEHIND_QUEUE_SIZE,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_ms: float = WRITE_BEHIND_FLUSH_MS,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+        spool_path: str = WRITE_BEHIND_SPOOL_PATH
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_retries = max_retries
+        self.spool_path = spool_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._spool_lock = threading.Lock()
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.failed_batches = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.callback_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        await self._replay_spool()
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Write-behind persistence started (batch {self.batch_size}, flush {self.flush_ms}ms)")
+
+    async def stop(self):
+        """Flush everything still queued, then stop the flusher"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Write-behind persistence stopped after {self.written} rows")
+
+    async def submit(self, row: dict, on_saved: Optional[Callable[[int], None]] = None):
+        """Queue a prediction row (prediction_rows format); waits only when the queue is full"""
+        item = (row, on_saved)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            await self._queue.put(item)
+        self.queued += 1
+
+    async def _next_batch(self) -> List[Tuple[dict, Optional[Callable[[int], None]]]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush_loop(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error(f"Write-behind flush of {len(batch)} rows failed unexpectedly: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _insert(self, rows: List[dict]) -> List[int]:
+        async with AsyncSessionLocal() as db:
+            try:
+                prediction_ids = (await db.scalars(bulk_insert_statement(), rows)).all()
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return list(prediction_ids)
+
+    async def _flush(self, batch):
+        rows = [row for row, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.timed("write_behind_insert"):
+                    prediction_ids = await self._insert(rows)
+                break
+            except Exception as e:
+                logger.error(f"Write-behind insert of {len(rows)} rows failed (attempt {attempt + 1}): {str(e)}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(min(0.1 * 2 ** attempt, 2.0))
+        else:
+            self.failed_batches += 1
+            await asyncio.to_thread(self._spool, rows)
+            return
+
+        self.batches += 1
+        self.written += len(rows)
+        for row in rows:
+            portfolio_stats.record(row["credit_score"], row["risk_level"], row["decision"], row["user_id"])
+        for (_, on_saved), prediction_id in zip(batch, prediction_ids):
+            if on_saved is None:
+                continue
+            try:
+                on_saved(prediction_id)
+            except Exception as e:
+                self.callback_errors += 1
+                logger.error(f"Write-behind callback for prediction {prediction_id} failed: {str(e)}")
+
+    def _spool(self, rows: List[dict]):
+        with self._spool_lock:
+            with open(self.spool_path, "a") as f:
+                for row in rows:
+                    f.write(_spool_line(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.spooled += len(rows)
+        logger.error(f"Spooled {len(rows)} predictions to {self.spool_path} for replay")
+
+    def _take_spool(self) -> List[dict]:
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return []
+            with open(self.spool_path) as f:
+                rows = [_parse_spool_line(line) for line in f if line.strip()]
+            os.remove(self.spool_path)
+        return rows
+
+    async def _replay_spool(self):
+        rows = await asyncio.to_thread(self._take_spool)
+        if not rows:
+            return
+        logger.info(f"Replaying {len(rows)} spooled predictions")
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            await self._flush([(row, None) for row in chunk])
+            self.replayed += len(chunk)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_ms,
+            "queued": self.queued,
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "backpressure_waits": self.backpressure_waits,
+            "failed_batches": self.failed_batches,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "callback_errors": self.callback_errors
+        }
+
+
+prediction_writer = PredictionWriter()
@@ -0,0 +1,224 @@
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Shared helpers for the benchmark and load tools; the app is only imported inside functions,
+# after configure_environment has pointed it at the benchmark database
+
+# Fields of CreditApplication the model never sees, with plausible values
+EXTRA_FIELD_CHOICES = {
+    "employment": ["employed", "self-employed", "unemployed", "student"],
+    "loanPurpose": ["business", "education", "home", "car"],
+    "location": ["urban", "rural"],
+    "phoneUsage": ["low", "medium", "high"],
+    "utilityPayments": ["on time", "late"],
+}
+INTEGER_FIELDS = ["age", "customerTenure", "avgDaysLateCurrent", "numLatePaymentsCurrent"]
+
+
+def configure_environment(db_path: str, overrides: Optional[Dict[str, str]] = None):
+    """Point the app at a private SQLite file; must run before ``app.main`` is imported"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("BROADCAST_BACKEND", "memory")
+    # Background reconciliation would add noise to the timings
+    os.environ.setdefault("PORTFOLIO_RECONCILE_SECONDS", "0")
+    for key, value in (overrides or {}).items():
+        os.environ[key] = value
+
+
+@contextmanager
+def benchmark_database(db_path: Optional[str] = None, overrides: Optional[Dict[str, str]] = None):
+    """Configure the app for ``db_path``, or for a temporary SQLite file removed on exit"""
+    workdir = None
+    if db_path is None:
+        workdir = tempfile.mkdtemp(prefix="credit-bench-")
+        db_path = os.path.join(workdir, "bench.db")
+    configure_environment(db_path, overrides)
+    try:
+        yield db_path
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+@asynccontextmanager
+async def in_process_app():
+    """
+    Run the app's lifespan (its startup and shutdown handlers) and yield
+    ``(app.main, client)`` with an in-process ASGI client
+    """
+    import httpx
+
+    from app import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            yield main, client
+
+
+async def access_token(client, email: str, password: str) -> str:
+    """Register ``email`` if it is new and log in; works against a live server or the ASGI client"""
+    await client.post("/register", json={"email": email, "username": email.split("@")[0], "password": password})
+    response = await client.post("/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def application_payloads(loaded, size: int, seed: int = 0) -> List[dict]:
+    """Valid /predict payloads whose categories come from the model's own vocabulary"""
+    from app.model_registry import sample_applications
+    from app.scoring import FEATURE_MAPPING
+
+    rng = random.Random(seed)
+    payloads = sample_applications(loaded, FEATURE_MAPPING, size, seed)
+    for i, payload in enumerate(payloads):
+        for field in INTEGER_FIELDS:
+            payload[field] = int(round(payload[field]))
+        payload["age"] = max(payload["age"], 19)
+        payload["client_name"] = f"Benchmark Client {seed}-{i}"
+        for field, choices in EXTRA_FIELD_CHOICES.items():
+            payload[field] = rng.choice(choices)
+    return payloads
+
+
+def seed_predictions(engine, count: int, user_id: Optional[int], seed: int = 0, chunk_size: int = 10000) -> float:
+    """
+    Insert ``count`` random predictions with the same distributions as
+    crud.create_test_predictions, in multi-row chunks so millions of rows stay
+    practical. Returns the seconds spent.
+    """
+    from sqlalchemy import insert
+
+    from app import models
+
+    rng = random.Random(seed)
+    risk_levels = ["very low", "low", "medium", "high", "very high"]
+    decisions = ["approved", "approved with conditions", "declined"]
+    now = datetime.utcnow()
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        for offset in range(0, count, chunk_size):
+            rows = [
+                {
+                    "client_name": f"Test Client {offset + i + 1}",
+                    "credit_score": rng.randint(300, 850),
+                    "risk_level": rng.choice(risk_levels),
+                    "decision": rng.choice(decisions),
+                    "income": rng.uniform(1000, 10000),
+                    "loan_amount": rng.uniform(500, 5000),
+                    "interest_rate": rng.uniform(5, 20),
+                    "employment": rng.choice(["employed", "self-employed", "unemployed"]),
+                    "loan_purpose": rng.choice(["business", "education", "home"]),
+                    "user_id": user_id,
+                    "timestamp": now - timedelta(days=rng.randint(0, 30), seconds=rng.randint(0, 86399))
+                }
+                for i in range(min(chunk_size, count - offset))
+            ]
+            connection.execute(insert(models.Prediction), rows)
+    return time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def summarize(latencies: Iterable[float], elapsed: Optional[float] = None) -> dict:
+    """Latency percentiles in milliseconds, plus throughput when the wall time is given"""
+    values = sorted(latency * 1000 for latency in latencies)
+    summary = {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4) if values else 0.0
+    }
+    if elapsed is not None:
+        summary["seconds"] = round(elapsed, 4)
+        summary["per_sec"] = round(len(values) / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def time_calls(fn: Callable[[], object], repeat: int) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def environment_info() -> dict:
+    """Where the numbers came from, so two result files can be compared fairly"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "started_at": datetime.utcnow().isoformat()
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> List[str]:
+    """Lines describing metrics that moved by more than ``threshold`` (relative) between two runs"""
+    before = flatten(baseline.get("results", {}))
+    after = flatten(current.get("results", {}))
+    lines = []
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        if abs(change) >= threshold:
+            lines.append(f"{name}: {old} -> {new} ({change:+.1%})")
+    return lines
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket in the fan-out benchmark; counts received messages"""
+
+    def __init__(self, on_message: Callable[[], None]):
+        self.on_message = on_message
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.received += 1
+        self.on_message()
+
+    async def close(self, code: int = 1000):
+        pass
@@ -0,0 +1,487 @@
+"""
+Open-loop load generator with production-like credit applications.
+
+Requests are sent at a fixed average rate, whether or not earlier ones have
+finished, and latency is measured from each request's scheduled send time,
+so a stalled server shows up as queueing instead of silently lowering the
+offered load. Run from backend/:
+
+    python -m benchmarks.loadgen --url http://localhost:8000 --rate 100 --duration 60 --ws-clients 50
+    python -m benchmarks.loadgen --in-process --rate 50 --duration 30
+
+Adding ``login`` to ``--mix`` interleaves bcrypt-bound logins with the
+scoring traffic, e.g. ``--mix predict=8,login=2``; compare the predict
+percentiles against a run without it.
+
+Applications are sampled per feature. Numeric features follow the training
+mean and standard deviation kept in the model's fitted StandardScaler, and
+categories are drawn uniformly from the model's vocabulary. The training
+CSV gives exact quantiles and category frequencies when it is available.
+
+Profile categories are kept in the encoder's vocabulary format: the
+notebook appended "_" to every label before fitting ("Retail" became
+"Retail_"), so CSV labels are suffixed the same way, and the "<UNK>" and
+"nan_" sentinels are never sampled.
+
+The bundled UI sends its own values instead ("retail", "term_loan", ...),
+none of which are in the vocabulary, so real form traffic takes the
+unseen-category fallback and logs a warning per request. ``--client-form-share``
+is the fraction of applications sent with those values (default 1.0, all of
+them, as the UI does); 0 measures only the in-vocabulary path:
+
+    python -m benchmarks.loadgen --fit-from credit_dataset_200000_rows.csv --save-profile profile.json
+    python -m benchmarks.loadgen --url http://localhost:8000 --profile profile.json --rate 200
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from .harness import (
+    EXTRA_FIELD_CHOICES,
+    INTEGER_FIELDS,
+    access_token,
+    benchmark_database,
+    environment_info,
+    in_process_app,
+    summarize,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = "predict=6,predict_auth=3,dashboard=1"
+LOADGEN_EMAIL = "loadgen@example.com"
+LOADGEN_PASSWORD = "loadgen-password"
+QUANTILE_STEPS = 100
+# Encoder classes added by the notebook for unknown and missing values, not labels clients send
+SENTINEL_LABELS = {"<UNK>", "nan_"}
+# Category values the UI sends (src/components/ApplicationForm.js), per form field
+CLIENT_FORM_VALUES = {
+    "industrySector": [
+        "retail", "services", "agriculture", "technology", "finance", "healthcare", "manufacturing", "construction"
+    ],
+    "creditType": ["term_loan", "line_of_credit"],
+    "hasGuarantee": ["yes", "no"],
+    "guaranteeType": ["collateral", "third_party"],
+    "repaymentFrequency": ["monthly", "quarterly"],
+}
+
+# Bounds CreditApplication accepts for each numeric form field
+FIELD_BOUNDS = {
+    "age": (19, 99),
+    "income": (1, None),
+    "loanAmount": (1, None),
+    "interestRate": (0.1, 30),
+    "turnover": (1, None),
+    "customerTenure": (0, None),
+    "avgDaysLateCurrent": (0, None),
+    "numLatePaymentsCurrent": (0, None),
+    "unpaidAmount": (0, None),
+}
+
+
+# Distribution profiles
+def vocabulary_label(table: Dict[str, int], value) -> str:
+    """A raw training label in the encoder's format; the notebook fitted on labels with "_" appended"""
+    label = str(value)
+    if label not in table and f"{label}_" in table:
+        return f"{label}_"
+    return label
+
+
+def profile_from_model(loaded) -> dict:
+    """Feature distributions recoverable from a loaded model without its training data"""
+    from app.model_registry import SAMPLE_NUMERIC_RANGES
+    from app.scoring import FEATURE_MAPPING
+
+    form_fields = {feature: form_field for form_field, feature in FEATURE_MAPPING.items()}
+    numeric = {
+        feature: {"uniform": list(SAMPLE_NUMERIC_RANGES.get(form_fields[feature], (0, 1000)))}
+        for feature in loaded.num_cols if feature in form_fields
+    }
+    scorer = loaded.scorer
+    for kind, positions, _, params in getattr(scorer, "_blocks", None) or []:
+        mean, scale = params if kind == "scale" else (None, None)
+        if mean is None or scale is None:
+            continue
+        for j, position in enumerate(positions):
+            feature = scorer.feature_names[position]
+            if feature in numeric:
+                numeric[feature] = {"mean": float(mean[j]), "std": float(scale[j])}
+
+    categorical = {
+        col: {label: 1.0 for label in loaded.encoder.tables[col] if label not in SENTINEL_LABELS}
+        for col in loaded.cat_cols if col != 'has_guarantee' and col in form_fields
+    }
+    return {"source": f"model {loaded.version}", "numeric": numeric, "categorical": categorical, "has_guarantee": 0.5}
+
+
+def profile_from_csv(path: str, loaded) -> dict:
+    """Empirical quantiles and category frequencies of a training CSV (model feature or form field columns)"""
+    import numpy as np
+    import pandas as pd
+
+    from app.inference import TRUE_VALUES
+    from app.scoring import FEATURE_MAPPING
+
+    df = pd.read_csv(path)
+    profile = profile_from_model(loaded)
+    profile["source"] = path
+    for form_field, feature in FEATURE_MAPPING.items():
+        column_name = feature if feature in df.columns else form_field if form_field in df.columns else None
+        if column_name is None:
+            logger.warning(f"{path} has no {feature} column, keeping the model-derived distribution")
+            continue
+        column = df[column_name].dropna()
+        if feature == 'has_guarantee':
+            profile["has_guarantee"] = float(column.astype(str).str.lower().isin(TRUE_VALUES).mean())
+        elif feature in profile["numeric"]:
+            quantiles = np.quantile(column.astype(float), np.linspace(0, 1, QUANTILE_STEPS + 1))
+            profile["numeric"][feature] = {"quantiles": [float(q) for q in quantiles]}
+        elif feature in profile["categorical"]:
+            table = loaded.encoder.tables[feature]
+            frequencies = column.map(lambda value: vocabulary_label(table, value)).value_counts(normalize=True)
+            profile["categorical"][feature] = {
+                label: float(share) for label, share in frequencies.items() if label not in SENTINEL_LABELS
+            }
+    return profile
+
+
+class ApplicationSampler:
+    """
+    Draws /predict payloads from a distribution profile; ``client_form_share``
+    of them carry the UI's category values instead of the profile's
+    """
+
+    def __init__(self, profile: dict, seed: int = 0, client_form_share: float = 1.0):
+        from app.scoring import FEATURE_MAPPING
+
+        self.profile = profile
+        self.client_form_share = client_form_share
+        self.feature_mapping = FEATURE_MAPPING
+        self.rng = random.Random(seed)
+        # Cumulative weights once, so each draw is one bisect
+        self._categories = {
+            feature: (list(weights), list(itertools.accumulate(weights.values())))
+            for feature, weights in profile["categorical"].items()
+        }
+        self._count = 0
+
+    def _numeric(self, form_field: str, spec: dict) -> float:
+        rng = self.rng
+        if "quantiles" in spec:
+            quantiles = spec["quantiles"]
+            position = rng.random() * (len(quantiles) - 1)
+            low = int(position)
+            high = min(low + 1, len(quantiles) - 1)
+            value = quantiles[low] + (quantiles[high] - quantiles[low]) * (position - low)
+        elif "mean" in spec:
+            value = rng.gauss(spec["mean"], spec["std"])
+        else:
+            value = rng.uniform(*spec["uniform"])
+
+        lower, upper = FIELD_BOUNDS.get(form_field, (None, None))
+        if lower is not None:
+            value = max(value, lower)
+        if upper is not None:
+            value = min(value, upper)
+        if form_field in INTEGER_FIELDS:
+            return int(round(value))
+        return round(value, 2)
+
+    def sample(self) -> dict:
+        rng = self.rng
+        self._count += 1
+        payload = {"client_name": f"Load Client {self._count}"}
+        client_form = rng.random() < self.client_form_share
+        for form_field, feature in self.feature_mapping.items():
+            if client_form and form_field in CLIENT_FORM_VALUES:
+                payload[form_field] = rng.choice(CLIENT_FORM_VALUES[form_field])
+            elif feature == 'has_guarantee':
+                payload[form_field] = "Yes" if rng.random() < self.profile["has_guarantee"] else "No"
+            elif feature in self._categories:
+                values, cumulative = self._categories[feature]
+                payload[form_field] = values[bisect.bisect_right(cumulative, rng.random() * cumulative[-1])]
+            elif feature in self.profile["numeric"]:
+                payload[form_field] = self._numeric(form_field, self.profile["numeric"][feature])
+        for field, choices in EXTRA_FIELD_CHOICES.items():
+            payload[field] = rng.choice(choices)
+        return payload
+
+
+# Load
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses = Counter()
+        self.exceptions = Counter()
+        self.skipped = 0
+
+    def summary(self, duration: float) -> dict:
+        summary = summarize(self.latencies, duration)
+        failed = sum(count for status, count in self.statuses.items() if status >= 400) + sum(self.exceptions.values())
+        attempted = len(self.latencies)
+        summary.update({
+            "errors": failed,
+            "error_rate": round(failed / attempted, 4) if attempted else 0.0,
+            "status_codes": {str(status): count for status, count in sorted(self.statuses.items())},
+            "exceptions": dict(self.exceptions),
+            "skipped_max_in_flight": self.skipped
+        })
+        return summary
+
+
+class WebSocketStats:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.broadcasts = 0
+        self.pong_latencies: List[float] = []
+
+    def summary(self, duration: float) -> dict:
+        return {
+            "connected": self.connected,
+            "failed": self.failed,
+            "broadcasts_received": self.broadcasts,
+            "broadcasts_per_sec": round(self.broadcasts / duration, 2) if duration > 0 else 0.0,
+            "ping_rtt": summarize(self.pong_latencies)
+        }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _predict(client, sampler, headers, args):
+    return await client.post("/predict", json=sampler.sample())
+
+
+async def _predict_auth(client, sampler, headers, args):
+    return await client.post("/predict", json=sampler.sample(), headers=headers)
+
+
+async def _dashboard(client, sampler, headers, args):
+    return await client.get("/dashboard-stats", headers=headers)
+
+
+async def _login(client, sampler, headers, args):
+    return await client.post("/login", data={"username": args.email, "password": args.password})
+
+
+ENDPOINTS = {
+    "predict": _predict,
+    "predict_auth": _predict_auth,
+    "dashboard": _dashboard,
+    "login": _login,
+}
+
+
+async def _ws_client(url: str, ping_interval: float, stop: asyncio.Event, stats: WebSocketStats):
+    import websockets
+
+    try:
+        async with websockets.connect(url) as ws:
+            stats.connected += 1
+            ping_times = deque()
+
+            async def _pings():
+                while not stop.is_set():
+                    ping_times.append(time.perf_counter())
+                    await ws.send(json.dumps({"type": "ping"}))
+                    try:
+                        await asyncio.wait_for(stop.wait(), ping_interval)
+                    except asyncio.TimeoutError:
+                        pass
+
+            pinger = asyncio.create_task(_pings())
+            try:
+                while not stop.is_set():
+                    try:
+                        message = json.loads(await asyncio.wait_for(ws.recv(), 0.5))
+                    except asyncio.TimeoutError:
+                        continue
+                    if message.get("type") == "pong" and ping_times:
+                        stats.pong_latencies.append(time.perf_counter() - ping_times.popleft())
+                    elif message.get("type") == "new_prediction":
+                        stats.broadcasts += 1
+            finally:
+                pinger.cancel()
+    except Exception as e:
+        stats.failed += 1
+        logger.warning(f"WebSocket client failed: {str(e)}")
+
+
+async def generate_load(client, sampler: ApplicationSampler, args, ws_url: Optional[str] = None) -> dict:
+    """Offer ``args.rate`` requests per second for ``args.duration`` seconds and collect per-endpoint stats"""
+    headers = {}
+    if any(name != "predict" for name in args.mix) or args.ws_clients:
+        headers = {"Authorization": f"Bearer {await access_token(client, args.email, args.password)}"}
+
+    stop = asyncio.Event()
+    ws_stats = WebSocketStats()
+    ws_tasks = []
+    if args.ws_clients:
+        if ws_url is None:
+            logger.warning("--ws-clients needs --url; the in-process client cannot open WebSockets")
+        else:
+            url = f"{ws_url}?token={headers['Authorization'].split(' ', 1)[1]}"
+            ws_tasks = [
+                asyncio.create_task(_ws_client(url, args.ws_ping_interval, stop, ws_stats))
+                for _ in range(args.ws_clients)
+            ]
+
+    rng = random.Random(args.seed)
+    names = list(args.mix)
+    weights = list(args.mix.values())
+    stats = {name: EndpointStats() for name in names}
+    in_flight = set()
+    max_lag = 0.0
+
+    async def _request(name: str, scheduled: float):
+        endpoint_stats = stats[name]
+        try:
+            response = await ENDPOINTS[name](client, sampler, headers, args)
+            endpoint_stats.statuses[response.status_code] += 1
+        except Exception as e:
+            endpoint_stats.exceptions[type(e).__name__] += 1
+        # From the scheduled send time, so client-side queueing is not hidden
+        endpoint_stats.latencies.append(time.perf_counter() - scheduled)
+
+    start = time.perf_counter()
+    next_at = start
+    end = start + args.duration
+    while next_at < end:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+
+        name = rng.choices(names, weights)[0]
+        if len(in_flight) >= args.max_in_flight:
+            stats[name].skipped += 1
+        else:
+            task = asyncio.create_task(_request(name, next_at))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        interval = 1 / args.rate
+        next_at += rng.expovariate(args.rate) if args.arrival == "poisson" else interval
+
+    if in_flight:
+        await asyncio.wait(in_flight, timeout=args.timeout)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if ws_tasks:
+        await asyncio.gather(*ws_tasks)
+
+    results = {name: endpoint_stats.summary(elapsed) for name, endpoint_stats in stats.items()}
+    results["offered_rate"] = args.rate
+    results["achieved_rate"] = round(sum(len(s.latencies) for s in stats.values()) / elapsed, 2)
+    results["max_scheduler_lag_ms"] = round(max_lag * 1000, 3)
+    if ws_tasks:
+        results["websocket"] = ws_stats.summary(elapsed)
+    return results
+
+
+def _load_local_model(model_path: Optional[str]):
+    from app.inference import UNSEEN_CATEGORY_FALLBACK
+    from app.model_artifact import DEFAULT_MODEL_PATH, load_model
+    from app.scoring import FEATURE_MAPPING
+
+    return load_model(model_path or DEFAULT_MODEL_PATH, FEATURE_MAPPING, fallback=UNSEEN_CATEGORY_FALLBACK)
+
+
+def _profile(args, loaded_model=None) -> dict:
+    if args.profile:
+        with open(args.profile) as f:
+            return json.load(f)
+    loaded = loaded_model or _load_local_model(args.model)
+    if args.fit_from:
+        return profile_from_csv(args.fit_from, loaded)
+    return profile_from_model(loaded)
+
+
+async def _run_live(args) -> dict:
+    import httpx
+
+    sampler = ApplicationSampler(_profile(args), args.seed, args.client_form_share)
+    ws_url = args.url.replace("http://", "ws://", 1).replace("https://", "wss://", 1).rstrip("/") + "/ws"
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await generate_load(client, sampler, args, ws_url)
+
+
+async def _run_in_process(args) -> dict:
+    async with in_process_app() as (main, client):
+        sampler = ApplicationSampler(_profile(args, main.model_registry.active), args.seed, args.client_form_share)
+        return await generate_load(client, sampler, args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the credit scoring service")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Base URL of a running server")
+    target.add_argument("--in-process", action="store_true", help="Drive the app in this process against a temporary SQLite file")
+    parser.add_argument("--rate", type=float, default=20, help="Offered requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson", help="Inter-arrival distribution")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Endpoint weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--ws-clients", type=int, default=0, help="WebSocket clients kept open during the run (--url only)")
+    parser.add_argument("--ws-ping-interval", type=float, default=1.0, help="Seconds between ping messages per WebSocket")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Arrivals beyond this many pending requests are skipped and counted")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout and final drain limit in seconds")
+    parser.add_argument("--email", default=LOADGEN_EMAIL, help="Account used for authenticated endpoints (registered if new)")
+    parser.add_argument("--password", default=LOADGEN_PASSWORD)
+    parser.add_argument("--model", help="Model to derive distributions from when no --profile is given (default: the bundled model)")
+    parser.add_argument("--profile", help="Distribution profile JSON written by --save-profile")
+    parser.add_argument("--fit-from", help="Training CSV to fit quantiles and category frequencies from")
+    parser.add_argument("--save-profile", help="Write the distribution profile here")
+    parser.add_argument("--client-form-share", type=float, default=1.0, help="Fraction of applications sent with the UI's category values, which are outside the model vocabulary")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="App setting for --in-process, repeatable")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level)
+    if args.save_profile:
+        with open(args.save_profile, "w") as f:
+            json.dump(_profile(args), f, indent=2)
+        logger.warning(f"Profile written to {args.save_profile}")
+        if not (args.url or args.in_process):
+            return
+    if not (args.url or args.in_process):
+        parser.error("one of --url or --in-process is required")
+
+    meta = environment_info()
+    meta["settings"] = {key: value for key, value in vars(args).items() if key not in ("output", "password")}
+    if args.in_process:
+        with benchmark_database(overrides=dict(item.split("=", 1) for item in args.env)):
+            results = asyncio.run(_run_in_process(args))
+    else:
+        results = asyncio.run(_run_live(args))
+
+    text = json.dumps({"meta": meta, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Offline benchmark suite for the scoring service.
+
+Everything runs in one process against a throwaway SQLite database and an
+in-process ASGI client, so no server, Postgres or network is needed. Run
+from backend/:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --scenarios predict,batch --baseline bench.json
+
+The defaults finish in a few minutes and suit a routine regression check.
+Large tables are opt-in, e.g. ``--sizes 10000,100000,1000000``.
+
+Results are written as JSON together with the commit and machine they were
+measured on; ``--baseline`` prints every metric that moved by more than
+``--threshold`` against an earlier result file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import List
+
+from .harness import (
+    FakeWebSocket,
+    access_token,
+    application_payloads,
+    benchmark_database,
+    compare,
+    environment_info,
+    in_process_app,
+    seed_predictions,
+    summarize,
+    time_calls,
+)
+
+SCENARIOS = ["score", "predict", "batch", "dashboard", "websocket", "login", "login_burst"]
+BENCH_EMAIL = "benchmark@example.com"
+BENCH_PASSWORD = "benchmark-password"
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+async def _timed_requests(send, count: int, concurrency: int):
+    """Run ``send(i)`` ``count`` times with at most ``concurrency`` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def _one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(count)))
+    summary = summarize(latencies, time.perf_counter() - start)
+    summary["errors"] = errors
+    return summary
+
+
+async def bench_score(main, client, args) -> dict:
+    """Single-row scoring without HTTP: preprocessing, encoding and predict_proba"""
+    loaded = main.model_registry.active
+    payloads = application_payloads(loaded, args.requests, args.seed)
+    main.result_cache.clear()
+
+    rows = iter(payloads)
+    misses = time_calls(lambda: main.score_application(next(rows), loaded), len(payloads))
+    rows = iter(payloads)
+    hits = time_calls(lambda: main.score_application(next(rows), loaded), len(payloads))
+    return {
+        "scorer_mode": loaded.info()["scorer_mode"],
+        "cold": summarize(misses),
+        "result_cache_hit": summarize(hits)
+    }
+
+
+async def bench_predict(main, client, args) -> dict:
+    """POST /predict end to end, one at a time and with concurrent callers"""
+    payloads = application_payloads(main.model_registry.active, args.requests, args.seed + 1)
+    main.result_cache.clear()
+
+    async def _send(i: int):
+        return await client.post("/predict", json=payloads[i % len(payloads)])
+
+    sequential = await _timed_requests(_send, args.requests, 1)
+    main.result_cache.clear()
+    concurrent = await _timed_requests(_send, args.requests, args.concurrency)
+    return {"sequential": sequential, f"concurrency_{args.concurrency}": concurrent}
+
+
+async def bench_batch(main, client, args) -> dict:
+    """POST /predict/batch rows per second at each batch size"""
+    results = {}
+    for size in args.batch_sizes:
+        payloads = application_payloads(main.model_registry.active, size, args.seed + 2)
+
+        async def _send(i: int):
+            return await client.post("/predict/batch", json={"applications": payloads})
+
+        summary = await _timed_requests(_send, args.batch_repeats, 1)
+        summary["rows_per_sec"] = round(size * summary["count"] / summary["seconds"], 1) if summary["seconds"] else 0.0
+        results[f"size_{size}"] = summary
+    return results
+
+
+async def bench_dashboard(main, client, args) -> dict:
+    """/dashboard-stats from the in-memory aggregate and from SQL as the table grows"""
+    from sqlalchemy import func, select
+
+    from app import models
+
+    token = await access_token(client, BENCH_EMAIL, BENCH_PASSWORD)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with main.AsyncSessionLocal() as db:
+        user = await main.resolve_user(token, db)
+    results = {}
+
+    for size in sorted(args.sizes):
+        with main.engine.connect() as connection:
+            existing = connection.execute(select(func.count(models.Prediction.id))).scalar_one()
+        seed_seconds = seed_predictions(main.engine, max(size - existing, 0), user.id, seed=args.seed)
+
+        start = time.perf_counter()
+        main.reconcile_portfolio_stats()
+        reload_seconds = time.perf_counter() - start
+
+        async def _memory(i: int):
+            return await client.get("/dashboard-stats", headers=headers)
+
+        async def _window(i: int):
+            return await client.get("/dashboard-stats", params={"days": 7}, headers=headers)
+
+        async def _full_scan(i: int):
+            return await client.get("/dashboard-stats", params={"days": 36500}, headers=headers)
+
+        results[f"rows_{size}"] = {
+            "seed_seconds": round(seed_seconds, 3),
+            "portfolio_reload_ms": round(reload_seconds * 1000, 3),
+            "in_memory": await _timed_requests(_memory, args.dashboard_requests, 1),
+            "sql_7_days": await _timed_requests(_window, args.dashboard_requests, 1),
+            "sql_all": await _timed_requests(_full_scan, args.dashboard_requests, 1)
+        }
+    return results
+
+
+async def bench_websocket(main, client, args) -> dict:
+    """Time from hub.publish until every subscribed client has been sent the message"""
+    results = {}
+    for count in args.clients:
+        expected = 0
+        delivered = 0
+        done = asyncio.Event()
+
+        def _on_message():
+            nonlocal delivered
+            delivered += 1
+            if delivered >= expected:
+                done.set()
+
+        clients = [
+            await main.hub.connect(FakeWebSocket(_on_message), main.build_subscription(None, None, None, None))
+            for _ in range(count)
+        ]
+        latencies = []
+        start = time.perf_counter()
+        for i in range(args.broadcasts):
+            expected, delivered = count, 0
+            done.clear()
+            sent_at = time.perf_counter()
+            main.hub.publish(
+                {"type": "new_prediction", "data": {"id": i, "credit_score": 700}},
+                main.Topic(None, "low", "approved")
+            )
+            await asyncio.wait_for(done.wait(), timeout=30)
+            latencies.append(time.perf_counter() - sent_at)
+        summary = summarize(latencies, time.perf_counter() - start)
+        summary["deliveries_per_sec"] = round(summary["per_sec"] * count, 1)
+        summary["dropped"] = main.hub.stats()["messages_dropped"]
+        results[f"clients_{count}"] = summary
+
+        for connection in clients:
+            await main.hub.disconnect(connection, close=False)
+    return results
+
+
+async def bench_login(main, client, args) -> dict:
+    """POST /login throughput; dominated by bcrypt in the password executor"""
+    await access_token(client, BENCH_EMAIL, BENCH_PASSWORD)
+
+    async def _send(i: int):
+        return await client.post("/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD})
+
+    return await _timed_requests(_send, args.logins, args.concurrency)
+
+
+async def bench_login_burst(main, client, args) -> dict:
+    """/predict latency under concurrent callers, alone and while a /login burst runs alongside"""
+    await access_token(client, BENCH_EMAIL, BENCH_PASSWORD)
+    payloads = application_payloads(main.model_registry.active, args.requests, args.seed + 3)
+
+    async def _predict(i: int):
+        return await client.post("/predict", json=payloads[i % len(payloads)])
+
+    async def _login(i: int):
+        return await client.post("/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD})
+
+    # Both runs start from an empty result cache so they score the same rows
+    main.result_cache.clear()
+    quiet = await _timed_requests(_predict, args.requests, args.concurrency)
+    main.result_cache.clear()
+    during_burst, logins = await asyncio.gather(
+        _timed_requests(_predict, args.requests, args.concurrency),
+        _timed_requests(_login, args.logins, args.concurrency)
+    )
+    return {
+        "predict_without_burst": quiet,
+        "predict_during_burst": during_burst,
+        "login_burst": logins,
+        "p50_ratio": round(during_burst["p50_ms"] / quiet["p50_ms"], 3) if quiet["p50_ms"] else 0.0,
+        "p99_ratio": round(during_burst["p99_ms"] / quiet["p99_ms"], 3) if quiet["p99_ms"] else 0.0
+    }
+
+
+BENCHMARKS = {
+    "score": bench_score,
+    "predict": bench_predict,
+    "batch": bench_batch,
+    "dashboard": bench_dashboard,
+    "websocket": bench_websocket,
+    "login": bench_login,
+    "login_burst": bench_login_burst,
+}
+
+
+async def run(args) -> dict:
+    results = {}
+    async with in_process_app() as (main, client):
+        for name in args.scenarios:
+            logging.getLogger(__name__).warning(f"Running {name}")
+            start = time.perf_counter()
+            results[name] = await BENCHMARKS[name](main, client, args)
+            results[name]["scenario_seconds"] = round(time.perf_counter() - start, 3)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the credit scoring service")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported by --baseline")
+    parser.add_argument("--db", help="SQLite file to use (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for payloads and seeded rows")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per latency measurement")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers for throughput runs")
+    parser.add_argument("--batch-sizes", type=_int_list, default=[100, 1000], help="Comma-separated /predict/batch sizes")
+    parser.add_argument("--batch-repeats", type=int, default=10, help="Requests per batch size")
+    parser.add_argument("--sizes", type=_int_list, default=[10000], help="Prediction table sizes for /dashboard-stats")
+    parser.add_argument("--dashboard-requests", type=int, default=50, help="Requests per dashboard measurement")
+    parser.add_argument("--clients", type=_int_list, default=[10, 100], help="WebSocket client counts")
+    parser.add_argument("--broadcasts", type=int, default=200, help="Messages published per client count")
+    parser.add_argument("--logins", type=int, default=50, help="Login requests, alone and in the login_burst scenario")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app setting, repeatable")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for the app while measuring")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(args.scenarios) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=args.log_level)
+    meta = environment_info()
+    meta["settings"] = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    with benchmark_database(args.db, dict(item.split("=", 1) for item in args.env)):
+        results = asyncio.run(run(args))
+    report = {"meta": meta, "results": results}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            changes = compare(json.load(f), report, args.threshold)
+        for line in changes or ["No metric moved by more than the threshold"]:
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()